@@ -30,24 +30,80 @@ ser utilizadas neste projeto.
 
 | Variável de ambiente | Padrão | Descrição |
 | - | - | - |
+| `PRODUCTION` | não definida | Modo de produção, que reduz o tempo de inicialização de cada processo do servidor. Os comandos `flask fake` não são carregados, e a especificação OpenAPI é lida de `APISPEC_FILE`, gerado no deploy com `flask apispec build`, em vez de ser gerada por cada processo. |
 | `SECRET_KEY` | `top-secret!` | Chave secreta para ser usada em tokens |
 | `DATABASE_URL`  | `sqlite:///db.sqlite` | A URL do banco de dados, definida pelo framework [SQLAlchemy](https://docs.sqlalchemy.org/en/14/core/engines.html#database-urls). |
 | `SQL_ECHO` | não definida | Define se será impresso no terminal instruções SQL (útil para debug). |
+| `DATABASE_REPLICA_URLS` | não definida | URLs de réplicas de leitura do banco de dados, separadas por vírgulas. Quando definida, as consultas das listagens e das buscas de usuários e questões são feitas em uma réplica escolhida ao acaso para cada requisição. A autenticação e as escritas sempre usam o banco de dados principal. |
+| `DATABASE_POOL_SIZE` | `5` | Número de conexões mantidas abertas por processo com o banco de dados. Também se aplica a bancos SQLite em arquivo, para que as configurações `SQLITE_*` sejam aplicadas uma única vez por conexão, e não a cada requisição. Não se aplica a bancos SQLite em memória. |
+| `DATABASE_MAX_OVERFLOW` | `10` | Número de conexões adicionais que podem ser abertas quando todas as conexões mantidas estão em uso. |
+| `DATABASE_POOL_TIMEOUT` | `30` | Tempo máximo em segundos de espera por uma conexão livre. |
+| `DATABASE_POOL_RECYCLE` | `1800` | Tempo em segundos após o qual uma conexão é reaberta, para evitar o uso de conexões encerradas pelo servidor. |
+| `DATABASE_POOL_PRE_PING` | `yes` | Define se as conexões são testadas antes de serem usadas. |
+| `SQLITE_JOURNAL_MODE` | `wal` | Modo de journal do SQLite. No modo `wal`, as leituras não são bloqueadas pelas escritas. Deixe vazia para usar o padrão do banco de dados. |
+| `SQLITE_SYNCHRONOUS` | `normal` | Nível de sincronização do SQLite com o disco. O valor `normal` é seguro no modo `wal`. Deixe vazia para usar o padrão do banco de dados. |
+| `SQLITE_BUSY_TIMEOUT` | `5000` | Tempo máximo em milissegundos de espera por um banco de dados SQLite bloqueado por outra conexão. |
+| `SQLITE_MMAP_SIZE` | `268435456` | Tamanho máximo em bytes do banco de dados SQLite mapeado em memória. Use `0` para desativar. |
+| `SQLITE_CACHE_SIZE` | `-64000` | Tamanho do cache de páginas de cada conexão SQLite. Valores negativos são em KiB. |
+| `LAST_SEEN_WRITE_BEHIND` | não definida | Define se as atualizações de `last_seen` dos usuários serão acumuladas em memória e gravadas em lote, em vez de uma escrita no banco a cada requisição autenticada. |
+| `LAST_SEEN_FLUSH_SECONDS` | `60` | Intervalo em segundos entre as gravações em lote de `last_seen`. |
+| `LAST_SEEN_GRANULARITY_SECONDS` | `60` | Precisão em segundos de `last_seen`. O valor é arredondado para baixo, e um usuário só é atualizado uma vez por intervalo. Como `last_seen` faz parte das respostas com `ETag`, com `0` as respostas que incluem o próprio usuário autenticado mudam a cada requisição e nunca resultam em `304`. |
+| `FAST_SERIALIZERS` | `yes` | Define se usuários e questões serão serializados com funções pré-compiladas a partir dos esquemas, que produzem o mesmo resultado que o marshmallow em menos tempo. |
+| `FAST_JSON` | `yes` | Define se as respostas serão codificadas em JSON com o pacote [orjson](https://github.com/ijl/orjson), quando ele estiver instalado. Neste caso, o JSON é gerado em UTF-8, sem espaços. Datas e horas sem fuso horário são codificadas no formato ISO 8601 com o sufixo `Z`, assim como nos esquemas. |
+| `PAGINATION_TOTAL` | `exact` | Como o total de itens das coleções paginadas é calculado. Os valores permitidos são `exact` (contagem a cada requisição), `cached` (contagem mantida em cache) e `estimate` (estimativa do planejador de consultas, somente no PostgreSQL). |
+| `PAGINATION_TOTAL_CACHE_SIZE` | `1024` | Número máximo de totais mantidos em cache no modo `cached`. |
+| `PAGINATION_TOTAL_CACHE_SECONDS` | `60` | Tempo máximo em segundos que um total permanece em cache no modo `cached`. |
+| `RESPONSE_CACHE` | não definida | Define se as páginas das listagens de questões serão mantidas em cache. As páginas são invalidadas quando questões são criadas, editadas ou removidas, ou quando o autor edita seu perfil. |
+| `RESPONSE_CACHE_BACKEND` | não definida | Caminho de importação (`modulo:funcao`) de uma função que recebe a aplicação e retorna o armazenamento do cache, com métodos `get(key)` e `set(key, value, ttl=None)`. Por padrão, é usado um cache em memória em cada processo. |
+| `RESPONSE_CACHE_SIZE` | `1024` | Número máximo de páginas mantidas no cache em memória padrão. |
+| `RESPONSE_CACHE_SECONDS` | `30` | Tempo máximo em segundos que uma página permanece em cache. |
+| `COMPRESSION` | `yes` | Define se as respostas serão comprimidas, de acordo com as codificações aceitas pelo cliente no cabeçalho `Accept-Encoding`. As respostas enviadas aos poucos, como a exportação de questões, também são comprimidas. |
+| `COMPRESSION_ENCODINGS` | `zstd,br,gzip` | Codificações oferecidas, separadas por vírgulas e em ordem de preferência. As codificações `br` e `zstd` só são usadas quando os pacotes `brotli` e `zstandard`, respectivamente, estão instalados. |
+| `COMPRESSION_MIMETYPES` | `application/json,application/x-ndjson,text/html,text/plain` | Tipos de conteúdo das respostas que podem ser comprimidas, separados por vírgulas. |
+| `COMPRESSION_MIN_SIZE` | `500` | Tamanho mínimo em bytes de uma resposta para que ela seja comprimida. |
+| `COMPRESSION_GZIP_LEVEL` | `6` | Nível de compressão do gzip, de `1` (mais rápido) a `9` (menor resposta). |
+| `COMPRESSION_BROTLI_LEVEL` | `4` | Nível de compressão do brotli, de `0` a `11`. |
+| `COMPRESSION_ZSTD_LEVEL` | `3` | Nível de compressão do zstd, de `1` a `22`. |
+| `QUESTION_BATCH_MAX` | `1000` | Número máximo de questões que podem ser criadas em uma única requisição de criação em lote. |
+| `EXPORT_CHUNK_SIZE` | `1000` | Número de questões lidas do banco de dados de cada vez na exportação em NDJSON. |
 | `DISABLE_AUTH` | não definida | Define se haverá ou não autenticação na aplicação. Quando desativada, assume que o user cujo `id=1` deve existir no banco de dados. |
+| `PASSWORD_HASH_METHOD` | `pbkdf2:sha256` | Método de hash das senhas, no formato aceito pelo [Werkzeug](https://werkzeug.palletsprojects.com/en/2.1.x/utils/#werkzeug.security.generate_password_hash), como `pbkdf2:sha256:600000`. Senhas com hash em outro formato são atualizadas no próximo login. |
+| `PASSWORD_SALT_LENGTH` | `16` | Tamanho do salt usado no hash das senhas. |
+| `PASSWORD_HASH_WORKERS` | `0` | Número de processos usados por cada processo do servidor para calcular hashes de senhas fora da thread da requisição. Com `0`, os hashes são calculados na própria requisição. A requisição continua aguardando o hash, e por isso esta opção só é útil quando o gunicorn usa os tipos de worker `gthread` ou `gevent`, em que um processo atende outras requisições enquanto isso. Como cada processo do servidor tem os seus próprios processos de hash, até `GUNICORN_WORKERS` vezes este número de hashes podem ser calculados ao mesmo tempo. |
+| `PASSWORD_HASH_MAX_PENDING` | `0` | Número máximo de hashes aguardando os processos de hash de cada processo do servidor. Com `0`, é usado o quádruplo de `PASSWORD_HASH_WORKERS`. |
 | `ACCESS_TOKEN_MINUTES` | `15` | Validade do token de acesso em minutos. |
 | `REFRESH_TOKEN_DAYS` | `7` | Número de dias em que o token de refresh é válido. |
+| `ACCESS_TOKEN_SIGNED` | não definida | Define se os tokens de acesso serão tokens assinados, contendo o id do usuário e a validade, que são verificados sem consulta à tabela de tokens. Os tokens de refresh continuam armazenados no banco de dados. |
+| `REVOCATION_REFRESH_SECONDS` | `10` | Intervalo máximo em segundos para que um token de acesso assinado revogado em outro processo deixe de ser aceito. |
+| `TOKEN_CACHE_SIZE` | `1024` | Número máximo de tokens de acesso mantidos no cache em memória de cada processo. Use `0` para desativar o cache. |
+| `TOKEN_CACHE_SECONDS` | `5` | Tempo máximo em segundos que um token de acesso permanece no cache. O cache é de cada processo, e por isso um token revogado em outro processo (com `DELETE /api/tokens` ou pela revogação de todos os tokens do usuário após o reuso de um token de refresh) continua aceito pelos demais processos por até este tempo. Aumente este valor apenas se este atraso na revogação for aceitável, ou use `0` em `TOKEN_CACHE_SIZE` para desativar o cache. |
+| `TOKEN_SWEEP_SECONDS` | `3600` | Intervalo em segundos entre as remoções de tokens expirados, feitas em segundo plano por cada processo. Use `0` para desativar, e neste caso execute `flask tokens clean` periodicamente. |
+| `TOKEN_SWEEP_BATCH_SIZE` | `1000` | Número máximo de tokens expirados removidos por transação. |
 | `REFRESH_TOKEN_IN_COOKIE` | `yes` | Define se o token pode ser retornado em um cookie seguro. |
 | `REFRESH_TOKEN_IN_BODY' | `no` | Define se o refresh token virá no campo body. |
 | `RESET_TOKEN_MINUTES` | `15` | Número de minutos em que o token de reset é válido. |
 | `PASSWORD_RESET_URL` | `http://localhost:3000/reset` | A URL que será usada nos links de reseção de senha. |
 | `USE_CORS` | `yes` | Define se o CORS será suportado ou não, podendo ser configurável de acordo com a extensão flask-CORS. |
 | `DOCS_UI` | `elements` | Interface da documentação. Os valores permitidos são `swagger_ui`, `redoc`, `rapidoc` e `elements`. |
+| `APISPEC_FILE` | `apispec.json` | Arquivo com a especificação OpenAPI servida no modo de produção. |
+| `METRICS` | não definida | Define se as métricas da API serão registradas e publicadas no formato do [Prometheus](https://prometheus.io/docs/instrumenting/exposition_formats/) no endpoint `/metrics`. |
+| `METRICS_DIR` | não definida | Diretório onde cada processo grava suas métricas, para que o endpoint `/metrics` publique a soma das métricas de todos os processos. Deve ser definida quando o servidor usa mais de um processo. O diretório é esvaziado pelo gunicorn na inicialização. |
+| `METRICS_WRITE_SECONDS` | `5` | Intervalo mínimo em segundos entre as gravações das métricas de cada processo em `METRICS_DIR`. |
+| `QUERY_BUDGET` | `off` | Verificação do número de consultas SQL de cada requisição, útil durante o desenvolvimento e nos testes. Com `warn`, as requisições que excedem o limite são registradas no log, e com `error` elas resultam em erro. O número de consultas é retornado no cabeçalho `X-Query-Count`. |
+| `QUERY_BUDGET_MAX_QUERIES` | `10` | Número máximo de consultas SQL de uma requisição, para os endpoints que não declaram o seu próprio limite. |
+| `QUERY_BUDGET_MAX_REPEATS` | `3` | Número máximo de vezes que uma mesma consulta SQL pode ser executada em uma requisição. Consultas repetidas mais vezes são indicadas como possíveis consultas N+1. |
 | `MAIL_SERVER` | `localhost` | O servidor de email a ser utilizado para o envio de emails. |
 | `MAIL_PORT` | `25` | A porta utilizado pelo serviço de emails. |
 | `MAIL_USE_TLS` | não definida | Define se havera TLS ou não no serviço de envio de emails. |
 | `MAIL_USERNAME` | não definida | O usuário utilizado pelo serviço de envio de emails. |
 | `MAIL_PASSWORD` | não definida | A senha correspondente ao usuário utilizador do serviço de emails. |
 | `MAIL_DEFAULT_SENDER` | `nao-responda@formaplus.com.br` | Endereço padrão para envio de emails. |
+| `MAIL_QUEUE_SIZE` | `1000` | Número máximo de emails aguardando envio. Emails enviados com a fila cheia são descartados. |
+| `MAIL_WORKERS` | `2` | Número de threads que enviam os emails da fila. |
+| `MAIL_BATCH_SIZE` | `50` | Número máximo de emails enviados em uma mesma conexão com o servidor de email. |
+| `MAIL_MAX_RETRIES` | `3` | Número de novas tentativas de envio de um email que falhou. |
+| `MAIL_RETRY_SECONDS` | `1` | Intervalo antes da primeira nova tentativa de envio, dobrado a cada tentativa seguinte. |
+| `MAIL_SHUTDOWN_SECONDS` | `10` | Tempo máximo em segundos que um processo aguarda, ao ser encerrado, o envio dos emails que ainda estão na fila. A quantidade de emails não enviados é registrada no log. |
 
 ## Autenticação
 
@@ -130,7 +186,37 @@ The response body in a paginated request contains a `data` attribute that is
 set to the list of entities that are in the requested page. A `pagination`
 attribute is also included with `offset`, `limit`, `count` and `total`
 sub-attributes, which should enable the client to present pagination controls
-to the user.
+to the user. The `total` sub-attribute may be approximate, depending on the
+server configuration. Clients that do not need it can pass `total=false` in the
+query string, and the server will skip it. Example:
+
+    http://localhost:5000/api/questions?limit=10&total=false
+
+For large collections, the `cursor` argument enables keyset pagination, which
+does not count the items in the collection and has the same cost for any page.
+To request the first page, send an empty `cursor`. The `pagination` attribute
+in the response then includes `next` and `prev` sub-attributes, with the
+cursors that return the following and the preceding pages, and omits the
+`offset` and `total` sub-attributes. A cursor is an opaque string that should
+be passed back to the server without modifications. The `cursor` argument
+cannot be combined with `offset` or `after`. Examples:
+
+    http://localhost:5000/api/questions?limit=10&cursor=
+    http://localhost:5000/api/questions?limit=10&cursor=WyJuZXh0IiwiMjAyMi0wMS0wMVQwMDowMDowNCIsMTVd
+
+## Conditional Requests
+
+Endpoints that return users or questions include an `ETag` header in the
+response. A client that stores a response can later send its `ETag` value in
+the `If-None-Match` header of the same request. If the resource did not change,
+the server returns a `304` status code with no body, and the client can use the
+stored response.
+
+The `last_seen` attribute of the authenticated user is updated by its own
+requests, at most once per `LAST_SEEN_GRANULARITY_SECONDS`. Responses that
+include this user, such as `/api/me`, can only return `304` within this
+interval, so this setting should not be set to `0` when conditional requests
+are used.
 
 ## Errors
 
@@ -0,0 +1,55 @@
+import json
+import os
+
+import click
+from flask import Blueprint, current_app, send_file
+
+apispec = Blueprint('apispec', __name__)
+
+
+class APISpecCache:
+    """Serve the OpenAPI specification from a file built at deploy time.
+
+    APIFairy generates the specification from the schemas of all the
+    endpoints the first time it is requested in each process. In production
+    mode, when the ``APISPEC_FILE`` file exists, the ``/apispec.json``
+    endpoint returns that file instead. The file is created with the
+    ``flask apispec build`` command, and has no ``servers`` section, so that
+    clients use the host from which they downloaded it.
+    """
+    def __init__(self):
+        self.apifairy = None
+        self.path = None
+
+    def init_app(self, app, apifairy):
+        self.apifairy = apifairy
+        self.path = os.path.abspath(app.config['APISPEC_FILE'])
+        if not app.config['PRODUCTION'] or not apifairy.apispec_path:
+            return
+        if not os.path.exists(self.path):
+            app.logger.warning('%s not found, the OpenAPI specification will '
+                               'be generated at runtime', self.path)
+            return
+        app.view_functions['apifairy.json'] = self.view
+
+    def build(self, app):
+        """Return the OpenAPI specification of the application as JSON."""
+        with app.test_request_context():
+            spec = dict(self.apifairy.apispec)
+        spec.pop('servers', None)
+        return json.dumps(spec)
+
+    def view(self):
+        return send_file(self.path, mimetype='application/json')
+
+
+@apispec.cli.command()
+@click.option('--output', help='Arquivo gerado, em vez de APISPEC_FILE.')
+def build(output):  # pragma: no cover
+    """Gera a especificação OpenAPI usada no modo de produção"""
+    from api.app import apispec_cache
+    path = output or apispec_cache.path
+    with open(path + '.tmp', 'w') as f:
+        f.write(apispec_cache.build(current_app))
+    os.replace(path + '.tmp', path)
+    print('OpenAPI specification written to', path)
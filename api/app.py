@@ -5,29 +5,90 @@ from flask_marshmallow import Marshmallow
 from flask_cors import CORS
 from flask_mail import Mail
 from apifairy import APIFairy
+from api.apispec import APISpecCache
+from api.cache import LRUCache, ResponseCache
+from api.compression import Compression
+from api.encoder import JSONEncoder
+from api.engine import engine_options, configure_engines
+from api.hashing import PasswordHasher
+from api.mail_queue import MailQueue
+from api.metrics import Metrics
+from api.query_budget import QueryBudget
+from api.last_seen import LastSeenBuffer
+from api.replicas import ReadReplicas
+from api.revocation import RevocationSet
+from api.sweeper import TokenSweeper
 from config import Config
 
 db = Alchemical()
+read_replicas = ReadReplicas()
 migrate = Migrate()
 ma = Marshmallow()
 cors = CORS()
 mail = Mail()
+mail_queue = MailQueue()
 apifairy = APIFairy()
+apispec_cache = APISpecCache()
+password_hasher = PasswordHasher()
+token_cache = LRUCache()
+revoked_tokens = RevocationSet()
+total_cache = LRUCache()
+response_cache = ResponseCache()
+last_seen_buffer = LastSeenBuffer()
+token_sweeper = TokenSweeper()
+metrics = Metrics()
+query_budget = QueryBudget()
+compression = Compression()
+
+
+def collect_stats():
+    caches = [('token', token_cache), ('pagination_total', total_cache)]
+    if hasattr(response_cache.backend, 'stats'):
+        caches.append(('response', response_cache.backend))
+    for name, cache in caches:
+        stats = cache.stats()
+        yield 'cache_hits_total', {'cache': name}, stats['hits']
+        yield 'cache_misses_total', {'cache': name}, stats['misses']
+        yield 'cache_entries', {'cache': name}, stats['size']
+    stats = mail_queue.stats()
+    yield 'email_queue_depth', {}, stats['depth']
+    for result in ['sent', 'retried', 'failed', 'dropped']:
+        yield 'emails_total', {'result': result}, stats[result]
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    if app.config['FAST_JSON']:
+        app.json_encoder = JSONEncoder
 
     # extensions
     from api import models
+    app.config['ALCHEMICAL_ENGINE_OPTIONS'] = engine_options(app.config)
     db.init_app(app)
+    configure_engines(app, db)
+    read_replicas.init_app(app, db)
     migrate.init_app(app, db)
     ma.init_app(app)
     if app.config['USE_CORS']:  # pragma: no branch
         cors.init_app(app)
     mail.init_app(app)
+    mail_queue.init_app(app, mail)
     apifairy.init_app(app)
+    password_hasher.init_app(app)
+    token_cache.configure(app.config['TOKEN_CACHE_SIZE'],
+                          app.config['TOKEN_CACHE_SECONDS'])
+    revoked_tokens.init_app(app)
+    total_cache.configure(app.config['PAGINATION_TOTAL_CACHE_SIZE'],
+                          app.config['PAGINATION_TOTAL_CACHE_SECONDS'])
+    response_cache.init_app(app)
+    last_seen_buffer.init_app(app, db)
+    token_sweeper.init_app(app)
+    metrics.init_app(app, [db.get_engine(bind) for bind in [None] + list(
+        app.config.get('ALCHEMICAL_BINDS') or [])] + read_replicas.engines)
+    metrics.collector(collect_stats)
+    query_budget.init_app(app)
+    compression.init_app(app)
 
     # blueprints
     from api.errors import errors
@@ -38,13 +99,18 @@ def create_app(config_class=Config):
     app.register_blueprint(users, url_prefix='/api')
     from api.questions import questions
     app.register_blueprint(questions, url_prefix='/api')
-    from api.fake import fake
-    app.register_blueprint(fake)
+    from api.apispec import apispec
+    app.register_blueprint(apispec)
+    if not app.config['PRODUCTION']:
+        # the fake data commands are only used in development
+        from api.fake import fake
+        app.register_blueprint(fake)
+    apispec_cache.init_app(app, apifairy)
 
     # define the shell context
     @app.shell_context_processor
     def shell_context():  # pragma: no cover
-        ctx = {'db': db}
+        ctx = {'db': db, 'token_cache': token_cache}
         for attr in dir(models):
             model = getattr(models, attr)
             if hasattr(model, '__bases__') and \
@@ -1,5 +1,6 @@
 from flask import current_app
 from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth
+import sqlalchemy as sqla
 from werkzeug.exceptions import Unauthorized, Forbidden
 
 from api.app import db
@@ -12,10 +13,14 @@ token_auth = HTTPTokenAuth()
 @basic_auth.verify_password
 def verify_password(username, password):
     if username and password:
-        user = db.session.scalar(User.select().filter_by(username=username))
-        if user is None:
-            user = db.session.scalar(User.select().filter_by(email=username))
+        # a match on the username takes precedence over a match on the email
+        user = db.session.scalar(User.select().where(sqla.or_(
+            User.username == username, User.email == username)).order_by(
+                sqla.case((User.username == username, 0), else_=1)).limit(1))
         if user and user.verify_password(password):
+            if user.password_needs_rehash():
+                # the new hash is saved when the login request commits
+                user.password = password
             return user
 
 
@@ -0,0 +1,159 @@
+from collections import OrderedDict
+from functools import wraps
+import secrets
+from threading import Lock
+from time import monotonic
+
+from flask import current_app, request
+from werkzeug.utils import import_string
+
+
+class LRUCache:
+    """Thread-safe, size-bounded in-process cache with optional expiration.
+
+    Entries are evicted in least recently used order once ``maxsize`` is
+    reached, and are never returned after their time-to-live has elapsed. A
+    ``maxsize`` of zero disables the cache.
+    """
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def configure(self, maxsize, ttl=None):
+        with self._lock:
+            self.maxsize = maxsize
+            self.ttl = ttl
+            self._data.clear()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expiration = entry
+                if expiration is None or expiration > monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store a value.
+
+        The entry expires after the smallest of the cache-wide ``ttl`` and
+        the ``ttl`` given here, both in seconds.
+        """
+        if self.maxsize <= 0:
+            return
+        ttls = [t for t in (self.ttl, ttl) if t is not None]
+        expiration = monotonic() + min(ttls) if ttls else None
+        with self._lock:
+            self._data[key] = (value, expiration)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """Remove all the entries for which ``predicate(value)`` is true."""
+        with self._lock:
+            for key in [key for key, (value, _) in self._data.items()
+                        if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class ResponseCache:
+    """Cache of rendered responses, invalidated by tags.
+
+    Each cached response is associated with a list of tags, and a tag is
+    invalidated with :meth:`invalidate`, which discards all the responses
+    associated with it. The storage backend is an :class:`LRUCache` by
+    default. A different backend, such as a cache shared by all the worker
+    processes, can be configured in ``RESPONSE_CACHE_BACKEND`` as the import
+    path of a factory function that receives the application and returns an
+    object with ``get(key)`` and ``set(key, value, ttl=None)`` methods.
+
+    Tags are implemented as version strings stored in the backend and
+    included in the keys of the responses, so invalidation does not need to
+    find or delete the affected entries.
+    """
+    def __init__(self):
+        self.backend = None
+        self.ttl = None
+
+    def init_app(self, app):
+        self.ttl = app.config['RESPONSE_CACHE_SECONDS']
+        if not app.config['RESPONSE_CACHE']:
+            self.backend = None
+        elif app.config['RESPONSE_CACHE_BACKEND']:
+            self.backend = import_string(
+                app.config['RESPONSE_CACHE_BACKEND'])(app)
+        else:
+            self.backend = LRUCache(app.config['RESPONSE_CACHE_SIZE'],
+                                    self.ttl)
+
+    def _tag_version(self, tag):
+        version = self.backend.get('tag:' + tag)
+        if version is None:
+            version = secrets.token_hex(8)
+            self.backend.set('tag:' + tag, version)
+        return version
+
+    def invalidate(self, *tags):
+        if self.backend is None:
+            return
+        for tag in tags:
+            self.backend.set('tag:' + tag, secrets.token_hex(8))
+
+    def cached(self, tags):
+        """Cache the responses of a view function.
+
+        The key of a response is made from the endpoint, its view arguments
+        and the query arguments parsed by the view function, which are
+        passed as the last positional argument. ``tags`` is a function that
+        receives the view arguments and returns the tags of the response.
+        """
+        def inner(f):
+            @wraps(f)
+            def cached_response(*args, **kwargs):
+                if self.backend is None:
+                    return f(*args, **kwargs)
+
+                key = repr([request.endpoint, sorted(kwargs.items()),
+                            sorted(args[-1].items())] + [
+                    self._tag_version(tag) for tag in tags(**kwargs)])
+                cached = self.backend.get(key)
+                if cached is not None:
+                    data, status, headers = cached
+                    response = current_app.response_class(
+                        data, status=status, headers=headers)
+                    return response.make_conditional(request)
+
+                response = current_app.make_response(f(*args, **kwargs))
+                if response.status_code == 200:
+                    self.backend.set(key, (
+                        response.get_data(), response.status_code,
+                        list(response.headers)), ttl=self.ttl)
+                return response
+            return cached_response
+        return inner
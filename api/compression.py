@@ -0,0 +1,147 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+class GzipEncoder:
+    def __init__(self, level):
+        # a gzip header without a modification time, so that the same
+        # response always has the same compressed contents
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+ENCODERS = {
+    'zstd': (ZstdEncoder, 'COMPRESSION_ZSTD_LEVEL', zstandard),
+    'br': (BrotliEncoder, 'COMPRESSION_BROTLI_LEVEL', brotli),
+    'gzip': (GzipEncoder, 'COMPRESSION_GZIP_LEVEL', zlib),
+}
+
+
+class Compression:
+    """Compression of responses negotiated with the ``Accept-Encoding`` header.
+
+    The encodings listed in ``COMPRESSION_ENCODINGS`` are offered in order of
+    preference, skipping those whose package is not installed (``brotli``
+    for ``br`` and ``zstandard`` for ``zstd``). Only responses with one of
+    the ``COMPRESSION_MIMETYPES`` types and at least ``COMPRESSION_MIN_SIZE``
+    bytes are compressed. Streamed responses are compressed as they are
+    sent, with each chunk flushed to the client. The entity tag of a
+    compressed response is made weak, since its bytes differ from those of
+    the uncompressed response, while both are equivalent for the
+    ``If-None-Match`` comparison.
+    """
+    def __init__(self):
+        self.encodings = {}
+        self.mimetypes = set()
+        self.min_size = 0
+
+    def init_app(self, app):
+        self.encodings = {}
+        if not app.config['COMPRESSION']:
+            return
+        for name in app.config['COMPRESSION_ENCODINGS']:
+            if name not in ENCODERS:
+                raise ValueError(f'Unsupported compression encoding: {name}')
+            encoder, level_key, module = ENCODERS[name]
+            if module is not None:
+                self.encodings[name] = (encoder, app.config[level_key])
+        self.mimetypes = set(app.config['COMPRESSION_MIMETYPES'])
+        self.min_size = app.config['COMPRESSION_MIN_SIZE']
+        app.after_request(self._after_request)
+
+    def _after_request(self, response):
+        if response.status_code == 304:
+            # keep the weak entity tag that the client has
+            etag, weak = response.get_etag()
+            if etag:
+                response.vary.add('Accept-Encoding')
+                if not weak and request.if_none_match.is_weak(etag):
+                    response.set_etag(etag, weak=True)
+            return response
+        if response.status_code < 200 or response.status_code in [204, 206] \
+                or response.mimetype not in self.mimetypes \
+                or 'Content-Encoding' in response.headers \
+                or 'Content-Range' in response.headers \
+                or response.cache_control.no_transform:
+            return response
+        if not response.is_streamed and \
+                response.calculate_content_length() < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        name = request.accept_encodings.best_match(list(self.encodings))
+        if name is None:
+            return response
+        encoder_class, level = self.encodings[name]
+        encoder = encoder_class(level)
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, encoder)
+            response.direct_passthrough = False
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(encoder.compress(response.get_data()) +
+                              encoder.finish())
+        response.headers['Content-Encoding'] = name
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+def _compress_stream(iterable, encoder):
+    try:
+        for chunk in iterable:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield encoder.compress(chunk) + encoder.flush()
+        yield encoder.finish()
+    finally:
+        if hasattr(iterable, 'close'):
+            iterable.close()
@@ -1,32 +1,274 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
 from functools import wraps
-from flask import abort
+from hashlib import md5
+import json
+from flask import abort, current_app, g, request
 from apifairy import arguments, response
+from marshmallow import fields
 import sqlalchemy as sqla
-from api.app import db
+from sqlalchemy.sql.util import find_tables
+from api.app import db, total_cache, response_cache, metrics
 from api.schemas import StringPaginationSchema, PaginatedCollection
 
 
+def encode_cursor(direction, values):
+    data = [direction] + [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values]
+    return urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode(
+        'utf-8')).decode('ascii').rstrip('=')
+
+
+def _cursor_value(key, value):
+    python_type = key.type.python_type
+    if python_type is datetime:
+        if not isinstance(value, str):
+            raise TypeError('invalid cursor value')
+        return datetime.fromisoformat(value)
+    if python_type is int:
+        # bools and floats are not accepted, and integers must fit in a
+        # 64-bit database column
+        if type(value) is not int or not -2**63 <= value < 2**63:
+            raise ValueError('invalid cursor value')
+        return value
+    if type(value) is not python_type:
+        raise TypeError('invalid cursor value')
+    return value
+
+
+def decode_cursor(cursor, keys):
+    try:
+        data = json.loads(urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        direction, values = data[0], data[1:]
+        if direction not in ['next', 'prev'] or len(values) != len(keys):
+            raise ValueError('invalid cursor')
+        values = [_cursor_value(key, value)
+                  for key, value in zip(keys, values)]
+    except (ValueError, TypeError, IndexError, KeyError, OverflowError):
+        abort(400)
+    return direction, values
+
+
+def keyset_paginate(select_query, keys, descending, limit, cursor,
+                    loader_options=()):
+    """Return a page of results that starts right after the cursor position.
+
+    The rows are sorted by the composite key given in ``keys``, which must
+    end with a unique column so that rows with equal sort values are neither
+    skipped nor repeated.
+    """
+    backwards = False
+    if cursor:
+        direction, values = decode_cursor(cursor, keys)
+        backwards = direction == 'prev'
+        if descending != backwards:
+            condition = sqla.tuple_(*keys) < tuple(values)
+        else:
+            condition = sqla.tuple_(*keys) > tuple(values)
+        select_query = select_query.where(condition)
+    select_query = select_query.order_by(None).order_by(*[
+        key.desc() if descending != backwards else key.asc() for key in keys])
+
+    data = db.session.scalars(select_query.limit(limit + 1).options(
+        *loader_options)).all()
+    more = len(data) > limit
+    data = data[:limit]
+    if backwards:
+        data.reverse()
+
+    pagination = {'limit': limit, 'count': len(data)}
+    if data and (more if not backwards else True):
+        pagination['next'] = encode_cursor(
+            'next', [getattr(data[-1], key.key) for key in keys])
+    if data and (more if backwards else bool(cursor)):
+        pagination['prev'] = encode_cursor(
+            'prev', [getattr(data[0], key.key) for key in keys])
+    return data, pagination
+
+
+def estimate_total(select_query):
+    """Return the row count estimated by the PostgreSQL query planner."""
+    connection = db.session.connection()
+    compiled = select_query.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):  # pragma: no cover
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_total(select_query):
+    """Return the number of items in a collection and if the number is exact.
+
+    The ``PAGINATION_TOTAL`` configuration selects between an exact count,
+    a count cached for ``PAGINATION_TOTAL_CACHE_SECONDS`` or, on PostgreSQL,
+    the planner's estimate.
+    """
+    select_query = select_query.order_by(None)
+    mode = current_app.config['PAGINATION_TOTAL']
+    if mode == 'estimate' and \
+            db.session.get_bind().dialect.name == 'postgresql':
+        return estimate_total(select_query), False
+
+    count_query = sqla.select(sqla.func.count()).select_from(
+        select_query.subquery())
+    if mode != 'cached':
+        return db.session.scalar(count_query), True
+
+    compiled = count_query.compile()
+    key = (str(compiled), tuple(sorted(compiled.params.items())))
+    cached = total_cache.get(key)
+    if cached is not None:
+        return cached[0], False
+    count = db.session.scalar(count_query)
+    total_cache.set(key, (count, {
+        table.name for table in find_tables(select_query)}))
+    return count, True
+
+
+def invalidate_totals(model):
+    """Discard the cached totals of the collections that include a model."""
+    table = model.__tablename__
+    total_cache.delete_matching(lambda entry: table in entry[1])
+
+
+def rendered_attributes(schema):
+    """Return the column attributes that a schema renders, by model class.
+
+    Nested schemas are included, so that the related objects rendered with
+    an object are covered too.
+    """
+    attributes = {}
+    model = getattr(schema.opts, 'model', None)
+    if model is not None:
+        columns = {attr.key for attr in sqla.inspect(model).column_attrs}
+        attributes[model] = [field.attribute or name
+                             for name, field in schema.dump_fields.items()
+                             if (field.attribute or name) in columns]
+    for field in schema.dump_fields.values():
+        if isinstance(field, fields.Nested):
+            for model, keys in rendered_attributes(field.schema).items():
+                attributes.setdefault(model, keys)
+    return attributes
+
+
+def compute_etag(objects, extra=None, attributes=None):
+    """Return a strong entity tag for the current state of model objects.
+
+    ``attributes`` maps model classes to the attributes that are included in
+    the tag. Objects of other classes are tagged with all their columns.
+    """
+    digest = md5(repr(extra).encode('utf-8'))
+    for obj in objects:
+        mapper = sqla.inspect(obj).mapper
+        keys = (attributes or {}).get(mapper.class_)
+        if keys is None:
+            keys = [attr.key for attr in mapper.column_attrs]
+        digest.update(repr([mapper.class_.__name__] + [
+            getattr(obj, key) for key in keys]).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def conditional_response(state=None, schema=None):
+    """Answer conditional requests before the response is serialized.
+
+    The entity tag is computed from the model objects returned by the
+    decorated function, or of a paginated collection of them. The ``state``
+    function can be given to return, for each object, the list of objects
+    that are rendered with it. When the response ``schema`` is given, only
+    the columns that it renders are included in the tag. If the tag matches
+    the ``If-None-Match`` header of the request, a 304 response is returned.
+    """
+    state = state or (lambda obj: [obj])
+    attributes = None
+
+    def inner(f):
+        @wraps(f)
+        def conditional(*args, **kwargs):
+            nonlocal attributes
+            if attributes is None and schema is not None:
+                attributes = rendered_attributes(schema)
+            rv = f(*args, **kwargs)
+            if isinstance(rv, dict):
+                etag = compute_etag(
+                    [obj for item in rv['data'] for obj in state(item)],
+                    sorted(rv['pagination'].items()), attributes)
+            else:
+                etag = compute_etag(state(rv), attributes=attributes)
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                abort(response)
+            return rv, {'ETag': f'"{etag}"'}
+        return conditional
+    return inner
+
+
+def read_only(f):
+    """Send the queries of the decorated view function to a read replica.
+
+    Queries made after the view function writes to the database, and
+    everything done before it is called, such as authentication, still go
+    to the primary database.
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return f(*args, **kwargs)
+    return wrapper
+
+
 def paginated_response(schema, max_limit=25, order_by=None,
                        order_direction='asc',
-                       pagination_schema=StringPaginationSchema):
+                       pagination_schema=StringPaginationSchema,
+                       loader_options=(), etag=False, etag_state=None,
+                       cache_tags=None):
+    """Return a page of the collection selected by the decorated function.
+
+    The ``loader_options`` given, such as ``selectinload()`` or
+    ``joinedload()``, are applied to the query that loads the page, so that
+    related objects needed to render it are loaded with it. When ``etag`` is
+    set, conditional requests are handled as in :func:`conditional_response`,
+    with ``etag_state`` passed as its ``state`` argument. When ``cache_tags``
+    is given, the rendered pages are stored in the response cache with the
+    tags that it returns.
+    """
     def inner(f):
         @wraps(f)
         def paginate(*args, **kwargs):
             args = list(args)
             pagination = args.pop(-1)
             select_query = f(*args, **kwargs)
+
+            limit = pagination.get('limit', max_limit)
+            if limit > max_limit:
+                limit = max_limit
+            cursor = pagination.get('cursor')
+            if cursor is not None:
+                if limit <= 0:
+                    abort(400)
+                model = select_query.column_descriptions[0]['entity']
+                keys = [sqla.inspect(model).primary_key[0]]
+                if order_by is not None:
+                    keys.insert(0, order_by)
+                data, pagination = keyset_paginate(
+                    select_query, keys, order_direction == 'desc', limit,
+                    cursor, loader_options=loader_options)
+                metrics.increment('pagination_requests_total', mode='cursor',
+                                  total='omitted')
+                return {'data': data, 'pagination': pagination}
+
             if order_by is not None:
                 o = order_by.desc() if order_direction == 'desc' else order_by
                 select_query = select_query.order_by(o)
 
-            count = db.session.scalar(sqla.select(
-                sqla.func.count()).select_from(select_query))
+            count, exact = None, False
+            if pagination.get('include_total', True):
+                count, exact = get_total(select_query)
 
-            limit = pagination.get('limit', max_limit)
             offset = pagination.get('offset')
             after = pagination.get('after')
-            if limit > max_limit:
-                limit = max_limit
             if after is not None:
                 if offset is not None or order_by is None:  # pragma: no cover
                     abort(400)
@@ -43,21 +285,35 @@ def paginated_response(schema, max_limit=25, order_by=None,
             else:
                 if offset is None:
                     offset = 0
-                if offset < 0 or (count > 0 and offset >= count) or limit <= 0:
+                if offset < 0 or limit <= 0 or \
+                        (exact and count > 0 and offset >= count):
                     abort(400)
 
                 query = select_query.limit(limit).offset(offset)
 
-            data = db.session.scalars(query).all()
-            return {'data': data, 'pagination': {
+            data = db.session.scalars(query.options(*loader_options)).all()
+            metrics.increment(
+                'pagination_requests_total',
+                mode='after' if after is not None else 'offset',
+                total='omitted' if count is None else
+                'exact' if exact else 'approximate')
+            pagination = {
                 'offset': offset,
                 'limit': limit,
                 'count': len(data),
-                'total': count,
-            }}
+            }
+            if count is not None:
+                pagination['total'] = count
+            return {'data': data, 'pagination': pagination}
+
+        if etag:
+            paginate = conditional_response(etag_state, schema)(paginate)
 
         # wrap with APIFairy's arguments and response decorators
-        return arguments(pagination_schema)(response(PaginatedCollection(
-            schema, pagination_schema=pagination_schema))(paginate))
+        paginate = response(PaginatedCollection(
+            schema, pagination_schema=pagination_schema))(paginate)
+        if cache_tags is not None:
+            paginate = response_cache.cached(cache_tags)(paginate)
+        return arguments(pagination_schema)(paginate)
 
     return inner
@@ -0,0 +1,45 @@
+from datetime import date, datetime, time, timedelta
+
+from flask.json import JSONEncoder as FlaskJSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+class JSONEncoder(FlaskJSONEncoder):
+    """JSON encoder that uses orjson when it is installed.
+
+    Datetimes are encoded in ISO 8601 format, and those without a timezone
+    are assumed to be in UTC and get a ``Z`` suffix, as in the schemas.
+    Output from orjson is compact UTF-8, so ``JSON_AS_ASCII`` and the
+    separators given to ``dumps()`` are not applied. Indentation other
+    than two spaces, and values that orjson cannot encode, such as integers
+    larger than 64 bits, are handled by the standard library encoder.
+    """
+    def encode(self, o):
+        if orjson is None or self.indent not in [None, 2]:
+            return super().encode(o)
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | \
+            orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self.default,
+                                option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super().encode(o)
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            if o.tzinfo is None:
+                return o.isoformat() + 'Z'
+            if o.utcoffset() == timedelta(0):
+                return o.replace(tzinfo=None).isoformat() + 'Z'
+            return o.isoformat()
+        if isinstance(o, (date, time)):
+            return o.isoformat()
+        return super().default(o)
@@ -0,0 +1,69 @@
+import sqlalchemy as sqla
+
+
+def engine_options(config):
+    """Return the engine options for the application's databases.
+
+    The options in ``ALCHEMICAL_ENGINE_OPTIONS`` are extended with the pool
+    settings given in the ``DATABASE_POOL_*`` configuration variables. By
+    default SQLAlchemy opens a new connection for each session on SQLite
+    database files, so these get a pool too, and the pragmas set on new
+    connections then run once per pooled connection. In-memory databases
+    keep the default pool. The result is a function that receives the bind
+    name, as expected by Alchemical.
+    """
+    base_options = config['ALCHEMICAL_ENGINE_OPTIONS']
+
+    def options(bind):
+        url = config['ALCHEMICAL_DATABASE_URL'] if bind is None else \
+            config['ALCHEMICAL_BINDS'][bind]
+        opts = dict(base_options)
+        if url.startswith('sqlite'):
+            if sqla.engine.make_url(url).database in [None, '', ':memory:']:
+                return opts
+            # pooled connections are used by different threads
+            opts.setdefault('poolclass', sqla.pool.QueuePool)
+            opts['connect_args'] = dict(opts.get('connect_args') or {},
+                                        check_same_thread=False)
+        opts.setdefault('pool_size', config['DATABASE_POOL_SIZE'])
+        opts.setdefault('max_overflow', config['DATABASE_MAX_OVERFLOW'])
+        opts.setdefault('pool_timeout', config['DATABASE_POOL_TIMEOUT'])
+        if not url.startswith('sqlite'):
+            opts.setdefault('pool_recycle', config['DATABASE_POOL_RECYCLE'])
+            opts.setdefault('pool_pre_ping', config['DATABASE_POOL_PRE_PING'])
+        return opts
+    return options
+
+
+def sqlite_pragmas(config):
+    """Return the pragmas that are set on new SQLite connections."""
+    pragmas = {
+        'journal_mode': config['SQLITE_JOURNAL_MODE'],
+        'synchronous': config['SQLITE_SYNCHRONOUS'],
+        'busy_timeout': config['SQLITE_BUSY_TIMEOUT'],
+        'mmap_size': config['SQLITE_MMAP_SIZE'],
+        'cache_size': config['SQLITE_CACHE_SIZE'],
+    }
+    return {name: value for name, value in pragmas.items()
+            if value not in [None, '']}
+
+
+def configure_engine(engine, config):
+    """Set the configured pragmas on the connections of a SQLite engine."""
+    pragmas = sqlite_pragmas(config)
+    if pragmas and engine.dialect.name == 'sqlite':
+        sqla.event.listen(engine, 'connect', _set_pragmas(pragmas))
+
+
+def configure_engines(app, db):
+    for bind in [None] + list(app.config.get('ALCHEMICAL_BINDS') or []):
+        configure_engine(db.get_engine(bind), app.config)
+
+
+def _set_pragmas(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+    return set_pragmas
@@ -1,7 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor
 import random
+from time import perf_counter
 import click
 from flask import Blueprint
 from faker import Faker
+import sqlalchemy as sqla
 from api.app import db
 from api.models import User, Question
 
@@ -9,10 +12,83 @@ fake = Blueprint('fake', __name__)
 faker = Faker()
 
 
+def fake_users(count, seed):  # pragma: no cover
+    faker.seed_instance(seed)
+    return [{'username': faker.user_name(),
+             'domain': faker.free_email_domain(),
+             'about_me': faker.sentence()} for i in range(count)]
+
+
+def fake_questions(count, seed):  # pragma: no cover
+    faker.seed_instance(seed)
+    return [{'body': faker.paragraph(), 'answer': faker.paragraph(),
+             'timestamp': faker.date_time_this_year()} for i in range(count)]
+
+
+def generate_chunks(generator, num, chunk_size, workers):  # pragma: no cover
+    """Yield lists of fake rows, generating up to ``chunk_size`` at a time.
+
+    With ``workers`` the rows are generated in a process pool, with a bounded
+    number of chunks in flight so that memory use does not grow with ``num``.
+    """
+    sizes = [min(chunk_size, num - start)
+             for start in range(0, num, chunk_size)]
+    if not workers:
+        for size in sizes:
+            yield generator(size, random.getrandbits(32))
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending = []
+        for size in sizes:
+            pending.append(executor.submit(generator, size,
+                                           random.getrandbits(32)))
+            if len(pending) >= workers * 2:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def bulk_insert(table, chunks, prepare):  # pragma: no cover
+    """Insert chunks of rows with one executemany and commit per chunk."""
+    start = perf_counter()
+    total = 0
+    for chunk in chunks:
+        prepare(chunk, total)
+        db.session.execute(sqla.insert(table), chunk)
+        db.session.commit()
+        total += len(chunk)
+        elapsed = perf_counter() - start
+        print(f'{total} rows inserted ({total / elapsed:.0f} rows/s).',
+              end='\r', flush=True)
+    elapsed = perf_counter() - start
+    print(f'{total} rows inserted in {elapsed:.1f}s '
+          f'({total / elapsed if elapsed else 0:.0f} rows/s).')
+
+
 @fake.cli.command()
 @click.argument('num', type=int)
-def users(num):  # pragma: no cover
+@click.option('--bulk', is_flag=True,
+              help='Insere em lotes, sem criar objetos do ORM.')
+@click.option('--chunk-size', type=int, default=10000,
+              help='Número de linhas por lote no modo --bulk.')
+@click.option('--workers', type=int, default=0,
+              help='Processos usados pelo Faker no modo --bulk.')
+def users(num, bulk, chunk_size, workers):  # pragma: no cover
     """Cria o número informado de usuários"""
+    if bulk:
+        # usernames and emails get a numeric suffix to keep them unique
+        first = (db.session.scalar(sqla.select(sqla.func.max(User.id))) or
+                 0) + 1
+
+        def prepare(chunk, offset):
+            for i, row in enumerate(chunk, start=first + offset):
+                row['username'] = f'{row["username"]}_{i}'
+                row['email'] = f'{row["username"]}@{row.pop("domain")}'
+
+        bulk_insert(User.__table__, generate_chunks(
+            fake_users, num, chunk_size, workers), prepare)
+        return
+
     users = []
     for i in range(num):
         user = User(username=faker.user_name(), email=faker.email(),
@@ -26,8 +102,25 @@ def users(num):  # pragma: no cover
 
 @fake.cli.command()
 @click.argument('num', type=int)
-def questions(num):  # pragma: no cover
+@click.option('--bulk', is_flag=True,
+              help='Insere em lotes, sem criar objetos do ORM.')
+@click.option('--chunk-size', type=int, default=10000,
+              help='Número de linhas por lote no modo --bulk.')
+@click.option('--workers', type=int, default=0,
+              help='Processos usados pelo Faker no modo --bulk.')
+def questions(num, bulk, chunk_size, workers):  # pragma: no cover
     """Cria o número informado de questões e associa a usuários aleatórios"""
+    if bulk:
+        user_ids = db.session.scalars(sqla.select(User.id)).all()
+
+        def prepare(chunk, offset):
+            for row in chunk:
+                row['user_id'] = random.choice(user_ids)
+
+        bulk_insert(Question.__table__, generate_chunks(
+            fake_questions, num, chunk_size, workers), prepare)
+        return
+
     users = db.session.scalars(User.select()).all()
     for i in range(num):
         user = random.choice(users)
@@ -0,0 +1,73 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+from threading import BoundedSemaphore
+
+from werkzeug.security import generate_password_hash, check_password_hash, \
+    DEFAULT_PBKDF2_ITERATIONS
+
+
+class PasswordHasher:
+    """Password hashing with configurable parameters.
+
+    The hash method and salt length are taken from the
+    ``PASSWORD_HASH_METHOD`` and ``PASSWORD_SALT_LENGTH`` configuration
+    variables. When ``PASSWORD_HASH_WORKERS`` is set, hashes are computed in
+    a pool with that many processes, created in each server process on first
+    use, and at most ``PASSWORD_HASH_MAX_PENDING`` hashes can be waiting for
+    the pool of a server process at a time.
+
+    The request still waits for its hash, so the pool only lets a server
+    process handle other requests meanwhile with the ``gthread`` or
+    ``gevent`` worker classes. With ``sync`` workers it adds overhead and
+    does not free the worker. Since each server process has its own pool,
+    up to the number of server processes times ``PASSWORD_HASH_WORKERS``
+    hashes can be computed at the same time.
+    """
+    def __init__(self):
+        self.method = 'pbkdf2:sha256'
+        self.salt_length = 16
+        self.workers = 0
+        self.max_pending = 0
+        self._executor = None
+        self._pid = None
+        self._semaphore = None
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.max_pending = app.config['PASSWORD_HASH_MAX_PENDING'] or \
+            self.workers * 4
+        self._executor = None
+
+    @property
+    def full_method(self):
+        """The method as it is recorded in the generated hashes."""
+        if self.method.startswith('pbkdf2:') and self.method.count(':') == 1:
+            return f'{self.method}:{DEFAULT_PBKDF2_ITERATIONS}'
+        return self.method
+
+    def generate(self, password):
+        return self._run(generate_password_hash, password, self.method,
+                         self.salt_length)
+
+    def check(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Check if a hash was made with different parameters."""
+        if password_hash.count('$') < 2:
+            return True
+        method, salt, _ = password_hash.split('$', 2)
+        return method != self.full_method or len(salt) != self.salt_length
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if self._executor is None or self._pid != os.getpid():
+            # the pool cannot be shared with forked worker processes
+            self._pid = os.getpid()
+            self._executor = ProcessPoolExecutor(self.workers)
+            self._semaphore = BoundedSemaphore(self.max_pending)
+        with self._semaphore:
+            return self._executor.submit(func, *args).result()
@@ -0,0 +1,105 @@
+import atexit
+from datetime import datetime, timedelta
+import os
+from threading import Event, Lock, Thread
+
+import sqlalchemy as sqla
+
+EPOCH = datetime(1970, 1, 1)
+
+
+class LastSeenBuffer:
+    """Write-behind buffer for the ``last_seen`` column of users.
+
+    When enabled, :meth:`api.models.User.ping` records the new timestamp here
+    instead of modifying the user, and a background thread writes all the
+    pending timestamps with a single batched ``UPDATE`` every
+    ``LAST_SEEN_FLUSH_SECONDS``. Pending updates are also written when the
+    process exits.
+    """
+    def __init__(self):
+        self.app = None
+        self.db = None
+        self.enabled = False
+        self.interval = 60
+        self.granularity = 0
+        self.pending = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.enabled = app.config['LAST_SEEN_WRITE_BEHIND']
+        self.interval = app.config['LAST_SEEN_FLUSH_SECONDS']
+        self.granularity = app.config['LAST_SEEN_GRANULARITY_SECONDS']
+        if self.enabled and self._thread is None:
+            atexit.register(self.stop)
+            os.register_at_fork(after_in_child=self._reset)
+
+    def truncate(self, timestamp):
+        """Round a timestamp down to the configured granularity."""
+        if not self.granularity:
+            return timestamp
+        seconds = (timestamp - EPOCH).total_seconds()
+        return EPOCH + timedelta(seconds=seconds - seconds % self.granularity)
+
+    def record(self, user_id, last_seen):
+        with self._lock:
+            if last_seen > self.pending.get(user_id, EPOCH):
+                self.pending[user_id] = last_seen
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Write all the pending timestamps to the database.
+
+        Returns the number of users that were updated.
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+
+        from api.models import User
+        users = User.__table__
+        stmt = sqla.update(users).where(
+            users.c.id == sqla.bindparam('b_id'),
+            sqla.or_(users.c.last_seen.is_(None),
+                     users.c.last_seen < sqla.bindparam('b_last_seen')),
+        ).values(last_seen=sqla.bindparam('b_last_seen'))
+        try:
+            with self.db.begin() as session:
+                session.execute(stmt, [
+                    {'b_id': user_id, 'b_last_seen': last_seen}
+                    for user_id, last_seen in pending.items()])
+        except Exception:
+            # put the updates back so that they are retried on the next flush
+            with self._lock:
+                for user_id, last_seen in pending.items():
+                    if last_seen > self.pending.get(user_id, EPOCH):
+                        self.pending[user_id] = last_seen
+            raise
+        return len(pending)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                # the updates are kept and retried on the next flush
+                self.app.logger.exception('Could not write last_seen '
+                                          'timestamps')
+
+    def _reset(self):
+        # a forked worker starts with a clean buffer and no flush thread
+        self.pending = {}
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None
@@ -0,0 +1,183 @@
+import atexit
+import os
+import queue
+from threading import Event, Lock, Thread
+from time import monotonic
+
+
+class MailQueue:
+    """Bounded queue of email messages delivered by a pool of workers.
+
+    Each of the ``MAIL_WORKERS`` threads takes up to ``MAIL_BATCH_SIZE``
+    queued messages at a time and sends them over a single SMTP connection.
+    A message that fails is retried up to ``MAIL_MAX_RETRIES`` times on a
+    new connection, with an exponential backoff that starts at
+    ``MAIL_RETRY_SECONDS``. Messages
+    are discarded when the queue already has ``MAIL_QUEUE_SIZE`` messages.
+    When the process exits, the workers are given up to
+    ``MAIL_SHUTDOWN_SECONDS`` to send the messages that are still queued, and
+    the number of messages that could not be sent is logged.
+    """
+    def __init__(self):
+        self.app = None
+        self.mail = None
+        self.workers = 2
+        self.batch_size = 50
+        self.max_retries = 3
+        self.retry_seconds = 1
+        self.shutdown_seconds = 10
+        self.queue = queue.Queue()
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.unsent = 0
+        self._lock = Lock()
+        self._stop = Event()
+        self._threads = []
+
+    def init_app(self, app, mail):
+        self.app = app
+        self.mail = mail
+        self.workers = app.config['MAIL_WORKERS']
+        self.batch_size = app.config['MAIL_BATCH_SIZE']
+        self.max_retries = app.config['MAIL_MAX_RETRIES']
+        self.retry_seconds = app.config['MAIL_RETRY_SECONDS']
+        self.shutdown_seconds = app.config['MAIL_SHUTDOWN_SECONDS']
+        self.queue = queue.Queue(app.config['MAIL_QUEUE_SIZE'])
+        if not self._threads:
+            atexit.register(self.stop)
+            os.register_at_fork(after_in_child=self._reset)
+
+    def send(self, message):
+        """Queue a message for delivery.
+
+        Returns ``False`` if the queue is full and the message was discarded.
+        """
+        self._start()
+        try:
+            self.queue.put_nowait((message, 0))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            self.app.logger.warning('Email queue is full, message to %s '
+                                    'discarded', ', '.join(message.send_to))
+            return False
+        return True
+
+    def join(self):
+        """Wait until all the queued messages are sent or discarded."""
+        self.queue.join()
+
+    def stop(self, timeout=None):
+        """Stop the workers, after they send the queued messages.
+
+        The messages that are not sent within ``timeout`` seconds, which
+        defaults to ``MAIL_SHUTDOWN_SECONDS``, are discarded.
+        """
+        if self._stop.is_set():
+            return self.unsent + self.queue.qsize()
+        if timeout is None:
+            timeout = self.shutdown_seconds
+        deadline = monotonic() + timeout
+        if any(thread.is_alive() for thread in self._threads):
+            with self.queue.all_tasks_done:
+                while self.queue.unfinished_tasks and monotonic() < deadline:
+                    self.queue.all_tasks_done.wait(deadline - monotonic())
+        self._stop.set()
+        # batches that are being sent get a second to finish
+        deadline = max(deadline, monotonic() + 1)
+        for thread in self._threads:
+            thread.join(max(deadline - monotonic(), 0))
+        unsent = self.unsent + self.queue.qsize()
+        if unsent and self.app:
+            self.app.logger.warning('Email queue stopped with %d unsent '
+                                    'messages', unsent)
+        return unsent
+
+    def stats(self):
+        return {
+            'depth': self.queue.qsize(),
+            'maxsize': self.queue.maxsize,
+            'sent': self.sent,
+            'retried': self.retried,
+            'failed': self.failed,
+            'dropped': self.dropped,
+        }
+
+    def _start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads
+                             if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = Thread(target=self._run, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send_batch(self, batch):
+        pending = list(batch)
+        try:
+            while pending and not self._stop.is_set():
+                try:
+                    with self.mail.connect() as connection:
+                        while pending:
+                            connection.send(pending[0][0])
+                            pending.pop(0)
+                            with self._lock:
+                                self.sent += 1
+                except Exception:
+                    if not pending:
+                        # all the messages were sent, and closing the
+                        # connection failed, often because the server
+                        # already closed it
+                        self.app.logger.warning(
+                            'Error closing the email connection',
+                            exc_info=True)
+                        break
+                    # the connection cannot be trusted after an error, so the
+                    # remaining messages are sent on a new one after a backoff
+                    message, attempts = pending[0]
+                    if attempts < self.max_retries:
+                        with self._lock:
+                            self.retried += 1
+                        pending[0] = (message, attempts + 1)
+                        self._stop.wait(self.retry_seconds * 2 ** attempts)
+                    else:
+                        with self._lock:
+                            self.failed += 1
+                        pending.pop(0)
+                        self.app.logger.exception(
+                            'Could not send email to %s',
+                            ', '.join(message.send_to))
+            if pending:
+                # the queue was stopped while these messages were retried
+                with self._lock:
+                    self.unsent += len(pending)
+        finally:
+            for _ in batch:
+                self.queue.task_done()
+
+    def _run(self):
+        with self.app.app_context():
+            while not self._stop.is_set():
+                batch = self._next_batch()
+                if batch:
+                    self._send_batch(batch)
+
+    def _reset(self):
+        # a forked worker starts its own pool when it sends its first email
+        self._lock = Lock()
+        self._stop = Event()
+        self._threads = []
@@ -0,0 +1,247 @@
+import atexit
+from bisect import bisect_left
+import glob
+import json
+import os
+from threading import Lock
+from time import monotonic, perf_counter
+
+from flask import g, has_request_context, request
+import sqlalchemy as sqla
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Number of requests handled.'),
+    'http_request_duration_seconds': (
+        'histogram', 'Time taken to handle requests.'),
+    'sql_statements_total': (
+        'counter', 'Number of SQL statements executed by requests.'),
+    'sql_duration_seconds_total': (
+        'counter', 'Time spent executing SQL statements by requests.'),
+    'pagination_requests_total': (
+        'counter', 'Number of paginated responses by pagination mode.'),
+    'cache_hits_total': ('counter', 'Number of cache hits.'),
+    'cache_misses_total': ('counter', 'Number of cache misses.'),
+    'cache_entries': ('gauge', 'Number of entries stored in a cache.'),
+    'email_queue_depth': ('gauge', 'Number of emails waiting to be sent.'),
+    'emails_total': ('counter', 'Number of emails by delivery result.'),
+}
+
+
+class Metrics:
+    """Request, SQL and cache metrics in the Prometheus text format.
+
+    Each process keeps its own metrics. When ``METRICS_DIR`` is set, each
+    process also writes them to a file in that directory, at most every
+    ``METRICS_WRITE_SECONDS``, and the ``/metrics`` endpoint adds up the
+    files of all the processes. Counters of processes that have exited are
+    kept, while their gauges are discarded. The directory should be emptied
+    when the server starts.
+
+    Functions registered with :meth:`collector` are called when the metrics
+    are written, and return ``(name, labels, value)`` tuples with the current
+    values of metrics kept elsewhere, such as the statistics of caches.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.write_interval = 5
+        self.counters = {}
+        self.histograms = {}
+        self.collectors = []
+        self._lock = Lock()
+        self._last_write = 0
+
+    def init_app(self, app, engines):
+        self.enabled = app.config['METRICS']
+        self.collectors = []
+        if not self.enabled:
+            return
+        self.directory = app.config['METRICS_DIR']
+        self.write_interval = app.config['METRICS_WRITE_SECONDS']
+        for engine in engines:
+            if not sqla.event.contains(engine, 'before_cursor_execute',
+                                       _before_cursor_execute):
+                sqla.event.listen(engine, 'before_cursor_execute',
+                                  _before_cursor_execute)
+                sqla.event.listen(engine, 'after_cursor_execute',
+                                  _after_cursor_execute)
+                sqla.event.listen(engine, 'handle_error', _handle_error)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.write)
+
+    def collector(self, f):
+        self.collectors.append(f)
+        return f
+
+    def increment(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            histogram[bisect_left(BUCKETS, value)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """Return the metrics of this process in a JSON serializable form."""
+        with self._lock:
+            counters = [[name, dict(labels), value]
+                        for (name, labels), value in self.counters.items()]
+            histograms = [[name, dict(labels), histogram]
+                          for (name, labels), histogram
+                          in self.histograms.items()]
+        gauges = []
+        for collect in self.collectors:
+            for name, labels, value in collect():
+                if METRICS[name][0] == 'counter':
+                    counters.append([name, labels, value])
+                else:
+                    gauges.append([name, labels, value])
+        return {'pid': os.getpid(), 'counters': counters,
+                'histograms': histograms, 'gauges': gauges}
+
+    def write(self):
+        self._last_write = monotonic()
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        """Return the snapshots of all the processes."""
+        if not self.directory:
+            return [self.snapshot()]
+        self.write()
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):  # pragma: no cover
+                continue
+            if not _is_alive(snapshot['pid']):
+                snapshot['gauges'] = []
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self):
+        values = {}
+        for snapshot in self.collect():
+            for kind in ['counters', 'gauges', 'histograms']:
+                for name, labels, value in snapshot[kind]:
+                    key = (name, tuple(sorted(labels.items())))
+                    if kind == 'histograms':
+                        total = values.setdefault(key, [0] * len(value))
+                        values[key] = [a + b for a, b in zip(total, value)]
+                    else:
+                        values[key] = values.get(key, 0) + value
+
+        lines = []
+        for name, (kind, description) in METRICS.items():
+            series = sorted((labels, value) for (metric, labels), value
+                            in values.items() if metric == name)
+            if not series:
+                continue
+            lines += [f'# HELP {name} {description}',
+                      f'# TYPE {name} {kind}']
+            for labels, value in series:
+                if kind != 'histogram':
+                    lines.append(f'{name}{_labels(labels)} {value}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket'
+                                 f'{_labels(labels + (("le", bound),))} '
+                                 f'{cumulative}')
+                lines.append(f'{name}_sum{_labels(labels)} {value[-1]}')
+                lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def view(self):
+        return self.render(), 200, {
+            'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    def _before_request(self):
+        g.metrics_start = perf_counter()
+        g.sql_statements = 0
+        g.sql_duration = 0
+
+    def _after_request(self, response):
+        if 'metrics_start' not in g:  # pragma: no cover
+            return response
+        endpoint = request.endpoint or 'none'
+        if endpoint == 'metrics':
+            return response
+        self.increment('http_requests_total', endpoint=endpoint,
+                       method=request.method,
+                       status=str(response.status_code))
+        self.observe('http_request_duration_seconds',
+                     perf_counter() - g.metrics_start, endpoint=endpoint,
+                     method=request.method)
+        self.increment('sql_statements_total', g.sql_statements,
+                       endpoint=endpoint)
+        self.increment('sql_duration_seconds_total', g.sql_duration,
+                       endpoint=endpoint)
+        if self.directory and \
+                monotonic() - self._last_write >= self.write_interval:
+            self.write()
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = perf_counter() - conn.info['query_start'].pop()
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_duration += elapsed
+
+
+def _handle_error(exception_context):
+    # a failed statement does not reach _after_cursor_execute, so its start
+    # time is removed here to not be left on the pooled connection
+    conn = exception_context.connection
+    if conn is not None and conn.info.get('query_start'):
+        conn.info['query_start'].pop()
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace(
+        '\n', '\\n')
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:  # pragma: no cover
+        pass
+    return True
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from hashlib import md5
 import secrets
 from time import time
@@ -7,9 +8,13 @@ from flask import current_app, url_for
 import jwt
 import sqlalchemy as sqla
 from sqlalchemy import orm as sqla_orm
-from werkzeug.security import generate_password_hash, check_password_hash
+from api.app import db, password_hasher, token_cache, last_seen_buffer, \
+    revoked_tokens
 
-from api.app import db
+
+@lru_cache(maxsize=4096)
+def avatar_digest(email):
+    return md5(email.lower().encode('utf-8')).hexdigest()
 
 
 class Updateable:
@@ -25,7 +30,8 @@ class Token(db.Model):
     access_token = sqla.Column(sqla.String(64), nullable=False, index=True)
     access_expiration = sqla.Column(sqla.DateTime, nullable=False)
     refresh_token = sqla.Column(sqla.String(64), nullable=False, index=True)
-    refresh_expiration = sqla.Column(sqla.DateTime, nullable=False)
+    refresh_expiration = sqla.Column(sqla.DateTime, nullable=False,
+                                     index=True)
     user_id = sqla.Column(sqla.Integer, sqla.ForeignKey('users.id'),
                           index=True)
 
@@ -42,13 +48,81 @@ class Token(db.Model):
     def expire(self):
         self.access_expiration = datetime.utcnow()
         self.refresh_expiration = datetime.utcnow()
+        token_cache.delete(self.access_token)
+        revoked_tokens.add(self.access_token)
+
+    def encode_access_token(self):
+        """Return the access token in the form that is given to clients.
+
+        With ``ACCESS_TOKEN_SIGNED`` enabled, this is a signed token that
+        carries the user id and the expiration, and uses the random access
+        token stored in the database as its identifier.
+        """
+        if not current_app.config['ACCESS_TOKEN_SIGNED']:
+            return self.access_token
+        return jwt.encode(
+            {
+                'exp': self.access_expiration,
+                'jti': self.access_token,
+                'sub': str(self.user_id),
+            },
+            current_app.config['SECRET_KEY'],
+            algorithm='HS256'
+        )
+
+    @staticmethod
+    def decode_access_token(access_token, verify_exp=True):
+        """Return the claims of a signed access token, or ``None``."""
+        try:
+            return jwt.decode(access_token, current_app.config['SECRET_KEY'],
+                              algorithms=['HS256'],
+                              options={'require': ['exp', 'jti', 'sub'],
+                                       'verify_exp': verify_exp})
+        except jwt.PyJWTError:
+            return
+
+    @staticmethod
+    def stored_access_token(access_token):
+        """Return the value stored in the database for a client's token."""
+        if not current_app.config['ACCESS_TOKEN_SIGNED']:
+            return access_token
+        data = Token.decode_access_token(access_token, verify_exp=False)
+        return data['jti'] if data else None
+
+    @staticmethod
+    def recently_revoked():
+        """Return the tokens revoked within the access token lifetime."""
+        now = datetime.utcnow()
+        window = now - timedelta(
+            minutes=current_app.config['ACCESS_TOKEN_MINUTES'])
+        return db.session.scalars(sqla.select(Token.access_token).where(
+            Token.refresh_expiration > window,
+            Token.refresh_expiration <= now)).all()
 
     @staticmethod
-    def clean():
-        """Remove any tokens that have been expired for more than a day."""
+    def clean(batch_size=None):
+        """Remove any tokens that have been expired for more than a day.
+
+        When ``batch_size`` is given, the tokens are deleted in batches of up
+        to that many rows, each committed in its own transaction. Returns the
+        number of tokens removed.
+        """
         yesterday = datetime.utcnow() - timedelta(days=1)
-        db.session.execute(Token.delete().where(
-            Token.refresh_expiration < yesterday))
+        if not batch_size:
+            return db.session.execute(Token.delete().where(
+                Token.refresh_expiration < yesterday)).rowcount
+
+        removed = 0
+        while True:
+            batch = sqla.select(Token.id).where(
+                Token.refresh_expiration < yesterday).limit(batch_size)
+            count = db.session.execute(
+                Token.delete().where(Token.id.in_(batch)).execution_options(
+                    synchronize_session=False)).rowcount
+            db.session.commit()
+            removed += count
+            if count < batch_size:
+                return removed
 
 
 class User(Updateable, db.Model):
@@ -82,7 +156,7 @@ class User(Updateable, db.Model):
 
     @property
     def avatar_url(self):
-        digest = md5(self.email.lower().encode('utf-8')).hexdigest()
+        digest = avatar_digest(self.email)
         return f'https://www.gravatar.com/avatar/{digest}?d=identicon'
 
     @property
@@ -91,13 +165,26 @@ class User(Updateable, db.Model):
 
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.generate(password)
 
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return password_hasher.needs_rehash(self.password_hash)
 
     def ping(self):
-        self.last_seen = datetime.utcnow()
+        last_seen = last_seen_buffer.truncate(datetime.utcnow())
+        if self.last_seen is not None and self.last_seen >= last_seen:
+            return
+        if last_seen_buffer.enabled:
+            # update the loaded user without flagging it as modified, the
+            # database is updated later in a batch
+            sqla_orm.attributes.set_committed_value(
+                self, 'last_seen', last_seen)
+            last_seen_buffer.record(self.id, last_seen)
+        else:
+            self.last_seen = last_seen
 
     def generate_auth_token(self):
         token = Token(user=self)
@@ -106,18 +193,54 @@ class User(Updateable, db.Model):
 
     @staticmethod
     def verify_access_token(access_token, refresh_token=None):
+        if current_app.config['ACCESS_TOKEN_SIGNED']:
+            return User.verify_signed_access_token(access_token)
+        cached = token_cache.get(access_token)
+        if cached is not None:
+            user_id, access_expiration = cached
+            if access_expiration > datetime.utcnow():
+                user = db.session.get(User, user_id)
+                if user:
+                    user.ping()
+                    if user in db.session.dirty:
+                        db.session.commit()
+                return user
+            return
         token = db.session.scalar(Token.select().filter_by(
             access_token=access_token))
         if token:
-            if token.access_expiration > datetime.utcnow():
-                token.user.ping()
+            now = datetime.utcnow()
+            if token.access_expiration > now:
+                token_cache.set(
+                    access_token, (token.user_id, token.access_expiration),
+                    ttl=(token.access_expiration - now).total_seconds())
+                # the token expires on commit, so the user is taken first
+                user = token.user
+                user.ping()
+                if user in db.session.dirty:
+                    db.session.commit()
+                return user
+
+    @staticmethod
+    def verify_signed_access_token(access_token):
+        data = Token.decode_access_token(access_token)
+        if data is None:
+            return
+        revoked_tokens.refresh(Token.recently_revoked)
+        if data['jti'] in revoked_tokens:
+            return
+        user = db.session.get(User, int(data['sub']))
+        if user:
+            user.ping()
+            if user in db.session.dirty:
                 db.session.commit()
-                return token.user
+        return user
 
     @staticmethod
     def verify_refresh_token(refresh_token, access_token):
         token = db.session.scalar(Token.select().filter_by(
-            refresh_token=refresh_token, access_token=access_token))
+            refresh_token=refresh_token,
+            access_token=Token.stored_access_token(access_token)))
         if token:
             if token.refresh_expiration > datetime.utcnow():
                 return token
@@ -128,7 +251,17 @@ class User(Updateable, db.Model):
             db.session.commit()
 
     def revoke_all(self):
+        if current_app.config['ACCESS_TOKEN_SIGNED']:
+            # signed access tokens remain valid until they expire, so the
+            # tokens are kept as expired to be found by the revocation check
+            now = datetime.utcnow()
+            db.session.execute(Token.update().where(
+                Token.user == self).values(
+                    access_expiration=now, refresh_expiration=now))
+            revoked_tokens.invalidate()
+            return
         db.session.execute(Token.delete().where(Token.user == self))
+        token_cache.delete_matching(lambda entry: entry[0] == self.id)
 
     def generate_reset_token(self):
         return jwt.encode(
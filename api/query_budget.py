@@ -0,0 +1,163 @@
+from collections import Counter
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from flask import current_app, g, request
+import sqlalchemy as sqla
+
+_recorders = ContextVar('query_recorders', default=())
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryRecorder:
+    """Record the SQL statements executed in the current context.
+
+    Statements are recorded from all the engines, while the recorder is
+    active as a context manager or between calls to :meth:`start` and
+    :meth:`stop`.
+    """
+    def __init__(self):
+        self.statements = []
+        self._token = None
+
+    def start(self):
+        _listen()
+        self._token = _recorders.set(_recorders.get() + (self,))
+        return self
+
+    def stop(self):
+        _recorders.reset(self._token)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.stop()
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self, max_repeats):
+        """Return the statements executed more than ``max_repeats`` times.
+
+        A statement that runs many times with different parameters in the
+        same request is usually a relationship loaded separately for each
+        object in a list, also known as an N+1 query pattern.
+        """
+        counts = Counter(statement for statement, _ in self.statements)
+        return {statement: count for statement, count in counts.items()
+                if count > max_repeats}
+
+    def check(self, max_queries=None, max_repeats=None):
+        """Raise :class:`QueryBudgetExceeded` if the budget was exceeded."""
+        problems = []
+        if max_queries is not None and self.count > max_queries:
+            problems.append(f'{self.count} queries executed, the maximum is '
+                            f'{max_queries}')
+        if max_repeats is not None:
+            for statement, count in self.repeated(max_repeats).items():
+                problems.append(f'possible N+1 query, executed {count} '
+                                f'times: {statement}')
+        if problems:
+            raise QueryBudgetExceeded('\n'.join(problems))
+
+
+class assert_queries(ContextDecorator):
+    """Fail if a block of code executes too many SQL statements.
+
+    Can be used as a context manager or a decorator::
+
+        with assert_queries(3):
+            client.get('/api/questions', headers=headers)
+
+    :class:`QueryBudgetExceeded` is raised when more than ``max_queries``
+    statements are executed, or when a statement is executed more than
+    ``max_repeats`` times.
+    """
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.recorder = None
+
+    def __enter__(self):
+        self.recorder = QueryRecorder().start()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.recorder.stop()
+        if exc_type is None:
+            self.recorder.check(self.max_queries, self.max_repeats)
+
+
+def max_queries(count):
+    """Declare the maximum number of SQL statements of a view function.
+
+    The count includes the statements of the whole request, such as those
+    issued by authentication and when the response is serialized. It is
+    checked by :class:`QueryBudget` when the ``QUERY_BUDGET`` configuration
+    variable is set.
+    """
+    def inner(f):
+        f.max_queries = count
+        return f
+    return inner
+
+
+class QueryBudget:
+    """Check the SQL statements of each request against a budget.
+
+    With ``QUERY_BUDGET`` set to ``warn`` the requests that exceed their
+    budget are logged, and with ``error`` they raise
+    :class:`QueryBudgetExceeded`. The budget of a request is the one given
+    to its view function with :func:`max_queries`, or else
+    ``QUERY_BUDGET_MAX_QUERIES``. Statements executed more than
+    ``QUERY_BUDGET_MAX_REPEATS`` times are reported as possible N+1 queries.
+    The number of statements is returned in the ``X-Query-Count`` header.
+    """
+    def __init__(self):
+        self.mode = None
+
+    def init_app(self, app):
+        self.mode = app.config['QUERY_BUDGET']
+        if self.mode not in ['warn', 'error']:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def _before_request(self):
+        g.query_recorder = QueryRecorder().start()
+
+    def _after_request(self, response):
+        recorder = g.pop('query_recorder', None)
+        if recorder is None:  # pragma: no cover
+            return response
+        recorder.stop()
+        response.headers['X-Query-Count'] = str(recorder.count)
+        view = current_app.view_functions.get(request.endpoint)
+        try:
+            recorder.check(
+                getattr(view, 'max_queries',
+                        current_app.config['QUERY_BUDGET_MAX_QUERIES']),
+                current_app.config['QUERY_BUDGET_MAX_REPEATS'])
+        except QueryBudgetExceeded as exc:
+            if self.mode == 'error':
+                raise
+            current_app.logger.warning('%s %s: %s', request.method,
+                                       request.path, exc)
+        return response
+
+
+def _record(conn, cursor, statement, parameters, context, executemany):
+    for recorder in _recorders.get():
+        recorder.statements.append((statement, parameters))
+
+
+def _listen():
+    if not sqla.event.contains(sqla.engine.Engine, 'before_cursor_execute',
+                               _record):
+        sqla.event.listen(sqla.engine.Engine, 'before_cursor_execute',
+                          _record)
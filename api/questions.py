@@ -1,46 +1,111 @@
-from flask import Blueprint, abort
-from apifairy import authenticate, body, response, other_responses
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, json, stream_with_context
+from apifairy import arguments, authenticate, body, response, \
+    other_responses
+import sqlalchemy as sqla
+from sqlalchemy import orm as sqla_orm
 
 from api import db
+from api.app import response_cache
 from api.models import User, Question
 from api.schemas import QuestionSchema
 from api.auth import token_auth
-from api.decorators import paginated_response
-from api.schemas import DateTimePaginationSchema
+from api.decorators import paginated_response, invalidate_totals, \
+    conditional_response, read_only
+from api.query_budget import max_queries
+from api.schemas import DateTimePaginationSchema, QuestionExportSchema, \
+    QuestionSearchSchema, OffsetPaginationSchema
+from api.search import search_questions
 
 questions = Blueprint('questions', __name__)
 question_schema = QuestionSchema()
 questions_schema = QuestionSchema()
 update_question_schema = QuestionSchema(partial=True)
+batch_question_schema = QuestionSchema(many=True)
+load_author = sqla_orm.joinedload(Question.author)
+
+
+def question_state(question):
+    return [question, question.author]
+
+
+def invalidate_question_pages(user_id):
+    response_cache.invalidate('questions', f'users/{user_id}/questions')
 
 
 @questions.route('/questions', methods=['POST'])
 @authenticate(token_auth)
 @body(question_schema)
 @response(questions_schema, 201)
+@max_queries(7)
 def new(args):
     """Cria uma nova questão"""
     user = token_auth.current_user()
     question = Question(author=user, **args)
     db.session.add(question)
     db.session.commit()
+    invalidate_totals(Question)
+    invalidate_question_pages(user.id)
     return question
 
 
+@questions.route('/questions/batch', methods=['POST'])
+@authenticate(token_auth)
+@body(batch_question_schema)
+@response(batch_question_schema, 201)
+@other_responses({400: 'Lote vazio ou maior que o permitido'})
+@max_queries(6)
+def batch(args):
+    """Cria várias questões
+
+    Recebe uma lista de questões, que são validadas e criadas em uma única
+    transação. Se alguma questão for inválida, nenhuma é criada e os erros
+    são informados pela posição da questão na lista. A resposta contém as
+    questões criadas, na mesma ordem em que foram enviadas. O tamanho máximo
+    do lote é definido pela configuração `QUESTION_BATCH_MAX`.
+    """
+    if not args or len(args) > current_app.config['QUESTION_BATCH_MAX']:
+        abort(400)
+    user = token_auth.current_user()
+    # the questions are inserted with a single executemany, since the ORM
+    # inserts them one by one to learn their ids, and then loaded back by
+    # author and timestamp, which is the same for the whole batch
+    timestamp = datetime.utcnow()
+    db.session.execute(sqla.insert(Question.__table__), [
+        dict(item, user_id=user.id, timestamp=timestamp) for item in args])
+    new_questions = db.session.scalars(Question.select().where(
+        Question.user_id == user.id, Question.timestamp == timestamp).order_by(
+            Question.id).options(load_author)).all()
+    db.session.expire_on_commit = False
+    db.session.commit()
+    invalidate_totals(Question)
+    invalidate_question_pages(user.id)
+    return new_questions
+
+
 @questions.route('/questions/<int:id>', methods=['GET'])
 @authenticate(token_auth)
 @response(question_schema)
 @other_responses({404: 'Question not found'})
+@conditional_response(question_state, question_schema)
+@read_only
+@max_queries(4)
 def get(id):
     """Obtém uma questão por id"""
-    return db.session.get(Question, id) or abort(404)
+    return db.session.get(Question, id, options=[load_author]) or abort(404)
 
 
 @questions.route('/questions', methods=['GET'])
 @authenticate(token_auth)
 @paginated_response(questions_schema, order_by=Question.timestamp,
                     order_direction='desc',
-                    pagination_schema=DateTimePaginationSchema)
+                    pagination_schema=DateTimePaginationSchema,
+                    loader_options=[load_author], etag=True,
+                    etag_state=question_state,
+                    cache_tags=lambda: ['questions'])
+@read_only
+@max_queries(6)
 def all():
     """Obtém todas as questões"""
     return Question.select()
@@ -50,20 +115,78 @@ def all():
 @authenticate(token_auth)
 @paginated_response(questions_schema, order_by=Question.timestamp,
                     order_direction='desc',
-                    pagination_schema=DateTimePaginationSchema)
+                    pagination_schema=DateTimePaginationSchema,
+                    loader_options=[load_author], etag=True,
+                    etag_state=question_state,
+                    cache_tags=lambda id: [f'users/{id}/questions'])
 @other_responses({404: 'Usuário não encontrado'})
+@read_only
+@max_queries(7)
 def user_all(id):
     """Obtém todas as questões de um usuário específico"""
     user = db.session.get(User, id) or abort(404)
     return user.questions_select()
 
 
+@questions.route('/questions/search', methods=['GET'])
+@authenticate(token_auth)
+@paginated_response(questions_schema,
+                    pagination_schema=OffsetPaginationSchema,
+                    loader_options=[load_author], etag=True,
+                    etag_state=question_state)
+@arguments(QuestionSearchSchema)
+@read_only
+@max_queries(5)
+def search(args):
+    """Busca questões por texto
+
+    Retorna as questões cujo enunciado ou resposta contêm todas as palavras
+    informadas em `q`, ordenadas da mais relevante para a menos relevante. A
+    paginação é feita com `offset` e `limit`.
+    """
+    return search_questions(args['q'], db.session.get_bind().dialect.name)
+
+
+@questions.route('/questions/export', methods=['GET'])
+@authenticate(token_auth)
+@arguments(QuestionExportSchema)
+@max_queries(3)
+def export(args):
+    """Exporta questões em JSON delimitado por linhas
+
+    Retorna todas as questões, ordenadas por id, no formato
+    [NDJSON](http://ndjson.org/), com uma questão por linha. As questões podem
+    ser filtradas pelo autor (`author_id`) e pelo período de criação (`since`
+    e `until`). O resultado é enviado aos poucos, enquanto é lido do banco de
+    dados, e por isso pode ser usado para exportar coleções de qualquer
+    tamanho.
+    """
+    query = Question.select().options(load_author).order_by(Question.id)
+    if 'author_id' in args:
+        query = query.where(Question.user_id == args['author_id'])
+    if 'since' in args:
+        query = query.where(Question.timestamp >= args['since'])
+    if 'until' in args:
+        query = query.where(Question.timestamp < args['until'])
+    query = query.execution_options(
+        stream_results=True, yield_per=current_app.config['EXPORT_CHUNK_SIZE'])
+
+    def generate():
+        for chunk in db.session.scalars(query).partitions():
+            yield ''.join(json.dumps(question_schema.dump(question)) + '\n'
+                          for question in chunk)
+
+    return current_app.response_class(stream_with_context(generate()),
+                                      mimetype='application/x-ndjson')
+
+
 @questions.route('/questions/<int:id>', methods=['PUT'])
 @authenticate(token_auth)
 @body(update_question_schema)
 @response(question_schema)
 @other_responses({403: 'Não é permitida a edição desta pergunta',
                   404: 'Pergunta não encontrada'})
+@max_queries(8)
 def put(data, id):
     """Edita uma pergunta"""
     question = db.session.get(Question, id) or abort(404)
@@ -71,12 +194,14 @@ def put(data, id):
         abort(403)
     question.update(data)
     db.session.commit()
+    invalidate_question_pages(question.user_id)
     return question
 
 
 @questions.route('/questions/<int:id>', methods=['DELETE'])
 @authenticate(token_auth)
 @other_responses({403: 'Proibida a deleção da questão'})
+@max_queries(6)
 def delete(id):
     """Deleta uma questãot"""
     question = db.session.get(Question, id) or abort(404)
@@ -84,4 +209,6 @@ def delete(id):
         abort(403)
     db.session.delete(question)
     db.session.commit()
+    invalidate_totals(Question)
+    invalidate_question_pages(question.user_id)
     return '', 204
@@ -0,0 +1,57 @@
+import random
+
+from flask import g, has_app_context
+import sqlalchemy as sqla
+from sqlalchemy import orm as sqla_orm
+
+from api.engine import configure_engine
+
+
+class RoutingSession(sqla_orm.Session):
+    """Session that sends the queries of read-only requests to a replica.
+
+    Queries are sent to the primary database outside of read-only requests,
+    and also in read-only requests once the session has written anything
+    from the view function, so that the request sees its own changes.
+    """
+    router = None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        engine = self.router.replica_engine()
+        if engine is not None and not self.info.get('wrote'):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['wrote'] = True
+            elif clause is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+class ReadReplicas:
+    """Routing of the queries of read-only requests to read replicas.
+
+    The replicas are given in the ``DATABASE_REPLICA_URLS`` configuration
+    variable, and use the same engine options as the primary database. A
+    replica is chosen at random for each request made to a view function
+    decorated with :func:`api.decorators.read_only`.
+    """
+    def __init__(self):
+        self.engines = []
+
+    def init_app(self, app, db):
+        self.engines = []
+        for url in app.config['DATABASE_REPLICA_URLS']:
+            engine = sqla.create_engine(url, future=True,
+                                        **db.engine_options(None))
+            configure_engine(engine, app.config)
+            self.engines.append(engine)
+        if self.engines:
+            RoutingSession.router = self
+            db.session_class = RoutingSession
+
+    def replica_engine(self):
+        if not self.engines or not has_app_context() or \
+                not g.get('read_only'):
+            return None
+        if 'replica_engine' not in g:
+            g.replica_engine = random.choice(self.engines)
+        return g.replica_engine
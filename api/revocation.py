@@ -0,0 +1,47 @@
+from threading import Lock
+from time import monotonic
+
+
+class RevocationSet:
+    """In-memory set of signed access tokens that were revoked early.
+
+    Signed access tokens are validated without a database lookup, so tokens
+    that are revoked before they expire are recorded here. The set is
+    reloaded from the database by :meth:`refresh` at most once every
+    ``REVOCATION_REFRESH_SECONDS``, to learn about revocations made by other
+    processes. Only tokens revoked within the access token lifetime need to
+    be included, so the set stays small.
+    """
+    def __init__(self):
+        self.interval = 10
+        self.revoked = set()
+        self.recent = set()
+        self.refreshed = None
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.interval = app.config['REVOCATION_REFRESH_SECONDS']
+        self.invalidate()
+
+    def add(self, token_id):
+        with self._lock:
+            self.revoked.add(token_id)
+            # kept through the next reload, in case it is not committed yet
+            self.recent.add(token_id)
+
+    def invalidate(self):
+        """Force a reload from the database on the next check."""
+        self.refreshed = None
+
+    def refresh(self, loader):
+        """Reload the set with ``loader()`` if the refresh interval passed."""
+        now = monotonic()
+        if self.refreshed is None or now - self.refreshed >= self.interval:
+            revoked = set(loader())
+            with self._lock:
+                self.revoked = revoked | self.recent
+                self.recent = set()
+                self.refreshed = now
+
+    def __contains__(self, token_id):
+        return token_id in self.revoked
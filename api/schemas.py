@@ -1,8 +1,10 @@
+from flask import current_app
 from marshmallow import validate, validates, validates_schema, \
     ValidationError, post_dump
 from api import ma, db
 from api.auth import token_auth
 from api.models import User, Question
+from api.serializers import URLTemplate, compile_schema
 
 paginated_schema_cache = {}
 
@@ -18,13 +20,22 @@ class DateTimePaginationSchema(ma.Schema):
     limit = ma.Integer()
     offset = ma.Integer()
     after = ma.DateTime(load_only=True)
+    cursor = ma.String(load_only=True)
+    include_total = ma.Boolean(load_only=True, data_key='total')
     count = ma.Integer(dump_only=True)
     total = ma.Integer(dump_only=True)
+    next = ma.String(dump_only=True)
+    prev = ma.String(dump_only=True)
 
     @validates_schema
     def validate_schema(self, data, **kwargs):
         if data.get('offset') is not None and data.get('after') is not None:
             raise ValidationError('Não é permitido especificar ambos offset e after')
+        if data.get('cursor') is not None and (
+                data.get('offset') is not None or
+                data.get('after') is not None):
+            raise ValidationError(
+                'Não é permitido especificar cursor junto com offset ou after')
 
 
 class StringPaginationSchema(ma.Schema):
@@ -34,13 +45,33 @@ class StringPaginationSchema(ma.Schema):
     limit = ma.Integer()
     offset = ma.Integer()
     after = ma.String(load_only=True)
+    cursor = ma.String(load_only=True)
+    include_total = ma.Boolean(load_only=True, data_key='total')
     count = ma.Integer(dump_only=True)
     total = ma.Integer(dump_only=True)
+    next = ma.String(dump_only=True)
+    prev = ma.String(dump_only=True)
 
     @validates_schema
     def validate_schema(self, data, **kwargs):
         if data.get('offset') is not None and data.get('after') is not None:
             raise ValidationError('Não é permitido especificar ambos offset e after')
+        if data.get('cursor') is not None and (
+                data.get('offset') is not None or
+                data.get('after') is not None):
+            raise ValidationError(
+                'Não é permitido especificar cursor junto com offset ou after')
+
+
+class OffsetPaginationSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    limit = ma.Integer()
+    offset = ma.Integer()
+    include_total = ma.Boolean(load_only=True, data_key='total')
+    count = ma.Integer(dump_only=True)
+    total = ma.Integer(dump_only=True)
 
 
 def PaginatedCollection(schema, pagination_schema=StringPaginationSchema):
@@ -59,11 +90,36 @@ def PaginatedCollection(schema, pagination_schema=StringPaginationSchema):
     return PaginatedSchema
 
 
-class UserSchema(ma.SQLAlchemySchema):
+class CompiledDumpMixin:
+    """Dump objects with a serializer compiled from the schema fields.
+
+    ``compiled_getters`` can map field names to faster replacements of the
+    field's serialization. The compiled serializer is used when the
+    ``FAST_SERIALIZERS`` configuration is enabled.
+    """
+    compiled_getters = {}
+
+    def compiled_dump(self):
+        if '_compiled_dump' not in self.__dict__:
+            self._compiled_dump = compile_schema(self, self.compiled_getters)
+        return self._compiled_dump
+
+    def dump(self, obj, *, many=None):
+        if not current_app.config['FAST_SERIALIZERS']:
+            return super().dump(obj, many=many)
+        dump = self.compiled_dump()
+        if self.many if many is None else many:
+            return [dump(item) for item in obj]
+        return dump(obj)
+
+
+class UserSchema(CompiledDumpMixin, ma.SQLAlchemySchema):
     class Meta:
         model = User
         ordered = True
 
+    compiled_getters = {'url': URLTemplate('users.get')}
+
     id = ma.auto_field(dump_only=True)
     url = ma.String(dump_only=True)
     username = ma.auto_field(required=True,
@@ -113,12 +169,14 @@ class UpdateUserSchema(UserSchema):
             raise ValidationError('A senha está incorreta')
 
 
-class QuestionSchema(ma.SQLAlchemySchema):
+class QuestionSchema(CompiledDumpMixin, ma.SQLAlchemySchema):
     class Meta:
         model = Question
         include_fk = True
         ordered = True
 
+    compiled_getters = {'url': URLTemplate('questions.get')}
+
     id = ma.auto_field(dump_only=True)
     url = ma.String(dump_only=True)
     body = ma.auto_field(required=True, validate=validate.Length(
@@ -134,6 +192,24 @@ class QuestionSchema(ma.SQLAlchemySchema):
         return data
 
 
+class QuestionExportSchema(ma.Schema):
+    class Meta:
+        ordered = True
+
+    author_id = ma.Integer()
+    since = ma.DateTime()
+    until = ma.DateTime()
+
+
+class QuestionSearchSchema(ma.Schema):
+    q = ma.String(required=True, validate=validate.Length(min=1, max=256))
+
+    @validates('q')
+    def validate_q(self, value):
+        if not value.strip():
+            raise ValidationError('A busca deve conter ao menos uma palavra')
+
+
 class TokenSchema(ma.Schema):
     class Meta:
         ordered = True
@@ -0,0 +1,97 @@
+"""Full-text search of questions.
+
+On SQLite the questions are indexed by an FTS5 table that triggers keep in
+sync with the ``questions`` table, and on PostgreSQL by a GIN index on the
+``tsvector`` of the body and answer of each question, which the database
+updates along with the rows. Other databases fall back to a substring
+search without ranking.
+
+The migrations create the same objects as :func:`create_search_index`, so
+both need to be changed together.
+"""
+import sqlalchemy as sqla
+
+from api.models import Question
+
+FTS_TABLE = 'questions_fts'
+TS_CONFIG = 'simple'
+
+SQLITE_DDL = [
+    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(body, answer, '
+    f"content='questions', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f'CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON questions BEGIN '
+    f'INSERT INTO {FTS_TABLE}(rowid, body, answer) '
+    f'VALUES (new.id, new.body, new.answer); END',
+    f'CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON questions BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body, answer) '
+    f"VALUES ('delete', old.id, old.body, old.answer); END",
+    f'CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON questions BEGIN '
+    f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, body, answer) '
+    f"VALUES ('delete', old.id, old.body, old.answer); "
+    f'INSERT INTO {FTS_TABLE}(rowid, body, answer) '
+    f'VALUES (new.id, new.body, new.answer); END',
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+POSTGRESQL_DDL = [
+    f"CREATE INDEX ix_questions_search ON questions USING GIN "
+    f"(to_tsvector('{TS_CONFIG}', coalesce(body, '') || ' ' || "
+    f"coalesce(answer, '')))",
+]
+
+
+def create_search_index(connection):
+    """Create the search index and add the existing questions to it."""
+    ddl = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRESQL_DDL}.get(
+        connection.dialect.name, [])
+    for statement in ddl:
+        connection.exec_driver_sql(statement)
+
+
+def _fts_query(text):
+    # each word is quoted so that it is matched literally by FTS5
+    return ' '.join('"' + word.replace('"', '""') + '"'
+                    for word in text.split())
+
+
+def search_questions(text, dialect):
+    """Return a query for the questions that match ``text``, best first."""
+    if dialect == 'sqlite':
+        fts = sqla.table(FTS_TABLE, sqla.column('rowid'))
+        return Question.select().join(
+            fts, fts.c.rowid == Question.id).where(
+                sqla.text(f'{FTS_TABLE} MATCH :text').bindparams(
+                    text=_fts_query(text))).order_by(
+                        sqla.text(f'bm25({FTS_TABLE})'), Question.id)
+    elif dialect == 'postgresql':
+        document = sqla.func.to_tsvector(
+            sqla.literal_column(f"'{TS_CONFIG}'"),
+            sqla.func.coalesce(Question.body, '') + ' ' +
+            sqla.func.coalesce(Question.answer, ''))
+        query = sqla.func.websearch_to_tsquery(
+            sqla.literal_column(f"'{TS_CONFIG}'"), text)
+        return Question.select().where(document.op('@@')(query)).order_by(
+            sqla.func.ts_rank(document, query).desc(), Question.id)
+
+    words = [f'%{_escape_like(word)}%' for word in text.split()]
+    return Question.select().where(*[
+        sqla.or_(Question.body.ilike(word, escape='\\'),
+                 Question.answer.ilike(word, escape='\\'))
+        for word in words]).order_by(Question.timestamp.desc(), Question.id)
+
+
+def _escape_like(word):
+    # wildcards in the search text are matched literally
+    return word.replace('\\', '\\\\').replace('%', '\\%').replace(
+        '_', '\\_')
+
+
+@sqla.event.listens_for(Question.__table__, 'after_create')
+def _create_search_index(target, connection, **kwargs):
+    create_search_index(connection)
+
+
+@sqla.event.listens_for(Question.__table__, 'before_drop')
+def _drop_search_index(target, connection, **kwargs):
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
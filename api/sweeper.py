@@ -0,0 +1,45 @@
+from threading import Event, Thread
+
+
+class TokenSweeper:
+    """Background removal of expired tokens.
+
+    When ``TOKEN_SWEEP_SECONDS`` is set, each worker process runs a thread
+    that calls :meth:`api.models.Token.clean` with that interval, deleting
+    ``TOKEN_SWEEP_BATCH_SIZE`` tokens per transaction. The thread is started
+    on the first request handled by the process. The ``flask tokens clean``
+    command can be used instead, for example from a scheduled job.
+    """
+    def __init__(self):
+        self.app = None
+        self.interval = 0
+        self.batch_size = None
+        self._stop = Event()
+        self._thread = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config['TOKEN_SWEEP_SECONDS']
+        self.batch_size = app.config['TOKEN_SWEEP_BATCH_SIZE']
+        if self.interval:
+            app.before_request(self.start)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def sweep(self):
+        from api.models import Token
+        with self.app.app_context():
+            return Token.clean(self.batch_size)
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                self.app.logger.exception('Could not remove expired tokens')
@@ -1,3 +1,4 @@
+import click
 from flask import Blueprint, request, abort, current_app, url_for
 from werkzeug.http import dump_cookie
 from apifairy import authenticate, body, response, other_responses
@@ -8,6 +9,7 @@ from api.email import send_email
 from api.models import User, Token
 from api.schemas import TokenSchema, PasswordResetRequestSchema, \
     PasswordResetSchema, EmptySchema
+from api.query_budget import max_queries
 
 tokens = Blueprint('tokens', __name__)
 token_schema = TokenSchema()
@@ -24,7 +26,7 @@ def token_response(token):
             path=url_for('tokens.new'), secure=not current_app.debug,
             httponly=True, samesite=samesite)
     return {
-        'access_token': token.access_token,
+        'access_token': token.encode_access_token(),
         'refresh_token': token.refresh_token
         if current_app.config['REFRESH_TOKEN_IN_BODY'] else None,
     }, 200, headers
@@ -34,6 +36,7 @@ def token_response(token):
 @authenticate(basic_auth)
 @response(token_schema)
 @other_responses({401: 'Usuário ou senha inválido'})
+@max_queries(3)
 def new():
     """Cria um novo token de acesso ou de refresh
 
@@ -44,7 +47,6 @@ def new():
     user = basic_auth.current_user()
     token = user.generate_auth_token()
     db.session.add(token)
-    Token.clean()  # keep token table clean of old tokens
     db.session.commit()
     return token_response(token)
 
@@ -53,6 +55,7 @@ def new():
 @body(token_schema)
 @response(token_schema, description='Newly issued access and refresh tokens')
 @other_responses({401: 'Acesso ou token de refresh inválido'})
+@max_queries(5)
 def refresh(args):
     """Refresca um token de usuário
 
@@ -78,11 +81,12 @@ def refresh(args):
 @tokens.route('/tokens', methods=['DELETE'])
 @response(EmptySchema, status_code=204, description='Token revoked')
 @other_responses({401: 'Token de acesso inválido'})
+@max_queries(2)
 def revoke():
     """Revoga um token de acesso"""
     access_token = request.headers['Authorization'].split()[1]
     token = db.session.scalar(Token.select().filter_by(
-        access_token=access_token))
+        access_token=Token.stored_access_token(access_token)))
     if not token:  # pragma: no cover
         abort(401)
     token.expire()
@@ -94,6 +98,7 @@ def revoke():
 @body(PasswordResetRequestSchema)
 @response(EmptySchema, status_code=204,
           description='Email de reset de senha enviado')
+@max_queries(1)
 def reset(args):
     """Requisita um novo token para resetar senha"""
     user = db.session.scalar(User.select().filter_by(email=args['email']))
@@ -111,6 +116,7 @@ def reset(args):
 @response(EmptySchema, status_code=204,
           description='Senha resetada com sucesso')
 @other_responses({400: 'Token de reset inválido'})
+@max_queries(2)
 def password_reset(args):
     """Reseta a senha do usuário"""
     user = User.verify_reset_token(args['token'])
@@ -119,3 +125,11 @@ def password_reset(args):
     user.password = args['new_password']
     db.session.commit()
     return {}
+
+
+@tokens.cli.command()
+@click.option('--batch-size', type=int, default=1000,
+              help='Número máximo de tokens removidos por transação.')
+def clean(batch_size):  # pragma: no cover
+    """Remove os tokens expirados há mais de um dia"""
+    print(Token.clean(batch_size), 'tokens removed.')
@@ -6,7 +6,10 @@ from api import db
 from api.models import User
 from api.schemas import UserSchema, UpdateUserSchema, EmptySchema
 from api.auth import token_auth
-from api.decorators import paginated_response
+from api.questions import invalidate_question_pages
+from api.decorators import paginated_response, invalidate_totals, \
+    conditional_response, read_only
+from api.query_budget import max_queries
 
 users = Blueprint('users', __name__)
 user_schema = UserSchema()
@@ -17,17 +20,21 @@ update_user_schema = UpdateUserSchema(partial=True)
 @users.route('/users', methods=['POST'])
 @body(user_schema)
 @response(user_schema, 201)
+@max_queries(4)
 def new(args):
     """Cadastra um novo usuário"""
     user = User(**args)
     db.session.add(user)
     db.session.commit()
+    invalidate_totals(User)
     return user
 
 
 @users.route('/users', methods=['GET'])
 @authenticate(token_auth)
-@paginated_response(users_schema)
+@paginated_response(users_schema, etag=True)
+@read_only
+@max_queries(5)
 def all():
     """Obtém todos os usuários"""
     return User.select()
@@ -37,6 +44,9 @@ def all():
 @authenticate(token_auth)
 @response(user_schema)
 @other_responses({404: 'Usuário não encontrado'})
+@conditional_response(schema=user_schema)
+@read_only
+@max_queries(4)
 def get(id):
     """Obtém um usuário pelo id"""
     return db.session.get(User, id) or abort(404)
@@ -46,6 +56,9 @@ def get(id):
 @authenticate(token_auth)
 @response(user_schema)
 @other_responses({404: 'Usuário não encontrado'})
+@conditional_response(schema=user_schema)
+@read_only
+@max_queries(4)
 def get_by_username(username):
     """Obtém um usuário pelo atributo username"""
     return db.session.scalar(User.select().filter_by(username=username)) or \
@@ -55,6 +68,8 @@ def get_by_username(username):
 @users.route('/me', methods=['GET'])
 @authenticate(token_auth)
 @response(user_schema)
+@conditional_response(schema=user_schema)
+@max_queries(4)
 def me():
     """Obtém o usuário autenticado"""
     return token_auth.current_user()
@@ -64,6 +79,7 @@ def me():
 @authenticate(token_auth)
 @body(update_user_schema)
 @response(user_schema)
+@max_queries(6)
 def put(data):
     """Edita informação do usuário"""
     user = token_auth.current_user()
@@ -72,4 +88,7 @@ def put(data):
         abort(400)
     user.update(data)
     db.session.commit()
+    if set(data) - {'password', 'old_password'}:
+        # the user is embedded as author in question pages
+        invalidate_question_pages(user.id)
     return user
@@ -0,0 +1,148 @@
+"""Throughput and latency of the API under gunicorn with each worker class.
+
+For each worker class a gunicorn server with a single worker process is
+started on a new database, and a number of concurrent clients request
+pages of questions for a fixed time.
+
+Usage: python -m benchmarks.concurrency [--clients N] [--seconds N]
+           [--database-url URL] [--json]
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from threading import Thread
+from time import perf_counter, sleep
+
+WORKER_CLASSES = ['sync', 'gevent']
+
+
+def setup_database(url):
+    from api.app import create_app, db
+    from api.models import User, Question
+    from config import Config
+
+    class BenchmarkConfig(Config):
+        ALCHEMICAL_DATABASE_URL = url
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='bench', email='bench@example.com',
+                    password='bench')
+        db.session.add(user)
+        db.session.add_all([Question(body=f'question {i}', answer='answer',
+                                     author=user) for i in range(1000)])
+        db.session.commit()
+
+
+def start_server(worker_class, url, port):
+    env = dict(os.environ, DATABASE_URL=url,
+               GUNICORN_WORKER_CLASS=worker_class,
+               GUNICORN_BIND=f'127.0.0.1:{port}', GUNICORN_WORKERS='1',
+               TOKEN_SWEEP_SECONDS='0')
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', 'microblog:app'], env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/apispec.json')
+            connection.getresponse().read()
+            return server
+        except ConnectionError:
+            sleep(0.1)
+    server.terminate()
+    raise RuntimeError(f'The {worker_class} server did not start')
+
+
+def get_token(port):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    connection.request('POST', '/api/tokens', headers={
+        'Authorization': 'Basic YmVuY2g6YmVuY2g='})
+    return json.loads(connection.getresponse().read())['access_token']
+
+
+def run_clients(port, token, clients, seconds):
+    headers = {'Authorization': f'Bearer {token}'}
+    latencies = []
+    errors = [0]
+    deadline = perf_counter() + seconds
+
+    def client():
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        while perf_counter() < deadline:
+            start = perf_counter()
+            try:
+                connection.request('GET', '/api/questions?total=false',
+                                   headers=headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors[0] += 1
+                    continue
+            except (ConnectionError, http.client.HTTPException):
+                errors[0] += 1
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                continue
+            latencies.append(perf_counter() - start)
+
+    threads = [Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return {
+        'requests_per_second': round(len(latencies) / seconds),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1)
+        if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 1)
+        if latencies else None,
+        'errors': errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--database-url',
+                        help='database to use, instead of a new SQLite file')
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    url = args.database_url or 'sqlite:///' + os.path.join(
+        tempfile.mkdtemp(), 'bench.sqlite')
+    setup_database(url)
+
+    results = []
+    for worker_class in WORKER_CLASSES:
+        server = start_server(worker_class, url, args.port)
+        try:
+            result = run_clients(args.port, get_token(args.port),
+                                 args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        results.append(dict(worker_class=worker_class, **result))
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f'{"worker":<10}{"req/s":>8}{"p50 ms":>10}{"p99 ms":>10}'
+          f'{"errors":>8}')
+    for result in results:
+        print(f'{result["worker_class"]:<10}'
+              f'{result["requests_per_second"]:>8}{result["p50_ms"]:>10}'
+              f'{result["p99_ms"]:>10}{result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""Throughput and latency of the most used endpoints at several data sizes.
+
+For each size a database is seeded with that many questions, and then each
+scenario sends requests through the Flask test client, one at a time, for a
+fixed time. Seeded SQLite databases are kept in the data directory and
+copied for each run, so that all the runs start from the same data.
+
+Usage: python -m benchmarks.endpoints [--sizes N,N,...] [--seconds N]
+           [--database-url URL] [--data-dir DIR] [--output FILE]
+"""
+import argparse
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+from time import perf_counter
+
+SEED_VERSION = 1
+CHUNK_SIZE = 10000
+PASSWORD = 'benchmark'
+
+
+def seed(db, num_questions):
+    """Add users and questions with deterministic contents."""
+    import sqlalchemy as sqla
+    from werkzeug.security import generate_password_hash
+    from api.models import User, Question
+
+    rng = random.Random(num_questions)
+    password_hash = generate_password_hash(PASSWORD)
+    num_users = max(10, num_questions // 100)
+    now = datetime(2022, 1, 1)
+    db.session.execute(sqla.insert(User.__table__), [
+        {'username': f'user{i}', 'email': f'user{i}@example.com',
+         'password_hash': password_hash, 'first_seen': now, 'last_seen': now}
+        for i in range(num_users)])
+    words = ['question', 'answer', 'python', 'database', 'token', 'cache',
+             'page', 'user', 'request', 'response', 'index', 'query']
+    for start in range(0, num_questions, CHUNK_SIZE):
+        db.session.execute(sqla.insert(Question.__table__), [{
+            'body': ' '.join(rng.choices(words, k=20)),
+            'answer': ' '.join(rng.choices(words, k=10)),
+            'timestamp': now - timedelta(seconds=rng.randrange(31536000)),
+            'user_id': rng.randrange(num_users) + 1,
+        } for _ in range(min(CHUNK_SIZE, num_questions - start))])
+        db.session.commit()
+    db.session.commit()
+
+
+def prepare_database(args, size):
+    """Return the URL of a seeded database for the given size."""
+    from api.app import create_app, db
+    from config import Config
+
+    if args.database_url:
+        url = args.database_url
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        seeded = os.path.join(args.data_dir,
+                              f'questions-{size}-v{SEED_VERSION}.sqlite')
+        working = os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite')
+        if os.path.exists(seeded):
+            shutil.copy(seeded, working)
+            return 'sqlite:///' + working
+        url = 'sqlite:///' + seeded
+
+    class SeedConfig(Config):
+        ALCHEMICAL_DATABASE_URL = url
+
+    app = create_app(SeedConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(db, size)
+        # closing the connections checkpoints the write-ahead log into the
+        # database file, which otherwise is copied without the seeded data
+        db.get_engine().dispose()
+    if args.database_url:
+        return url
+    shutil.copy(seeded, working)
+    return 'sqlite:///' + working
+
+
+def measure(name, seconds, request):
+    latencies = []
+    for _ in range(5):  # warm up
+        request()
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        start = perf_counter()
+        request()
+        latencies.append(perf_counter() - start)
+    latencies.sort()
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / sum(latencies), 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+    }
+
+
+def run_size(args, size, url):
+    from api.app import create_app, db
+    from api.models import Question
+    from config import Config
+
+    class BenchmarkConfig(Config):
+        ALCHEMICAL_DATABASE_URL = url
+        REFRESH_TOKEN_IN_BODY = True
+        REFRESH_TOKEN_IN_COOKIE = False
+        TOKEN_SWEEP_SECONDS = 0
+        MAIL_SUPPRESS_SEND = True
+
+    app = create_app(BenchmarkConfig)
+    client = app.test_client()
+    basic = 'Basic ' + base64.b64encode(
+        f'user0:{PASSWORD}'.encode()).decode()
+
+    def expect(response, status=200):
+        if response.status_code != status:
+            raise RuntimeError(f'Unexpected response: {response.status} '
+                               f'{response.get_data(as_text=True)[:200]}')
+        return response.get_json()
+
+    # a refresh revokes the previous tokens, so it gets its own tokens
+    tokens = expect(client.post('/api/tokens',
+                                headers={'Authorization': basic}))
+    access_token = expect(client.post(
+        '/api/tokens', headers={'Authorization': basic}))['access_token']
+    headers = {'Authorization': 'Bearer ' + access_token}
+    with app.app_context():
+        deep = db.session.scalar(Question.select().order_by(
+            Question.timestamp.desc()).offset(size - 100).limit(1))
+        after = deep.timestamp.isoformat()
+
+    def refresh():
+        new_tokens = expect(client.put('/api/tokens', json=tokens))
+        tokens.update(new_tokens)
+
+    scenarios = [
+        ('tokens.new', lambda: expect(client.post(
+            '/api/tokens', headers={'Authorization': basic}))),
+        ('tokens.refresh', refresh),
+        ('verify_token', lambda: expect(client.get(
+            '/api/me', headers=headers))),
+        ('questions.all first page', lambda: expect(client.get(
+            '/api/questions', headers=headers))),
+        ('questions.all deep offset', lambda: expect(client.get(
+            f'/api/questions?offset={size - 100}', headers=headers))),
+        ('questions.all deep after', lambda: expect(client.get(
+            '/api/questions', query_string={'after': after},
+            headers=headers))),
+        ('users.get_by_username', lambda: expect(client.get(
+            '/api/users/user1', headers=headers))),
+        ('questions.new', lambda: expect(client.post(
+            '/api/questions', json={'body': 'benchmark question',
+                                    'answer': 'benchmark answer'},
+            headers=headers), 201)),
+    ]
+    results = []
+    for name, request in scenarios:
+        if args.scenario and not any(s in name for s in args.scenario):
+            continue
+        result = measure(name, args.seconds, request)
+        results.append(dict(size=size, **result))
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'],
+                              capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):  # pragma: no cover
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10000,100000,1000000',
+                        help='comma-separated numbers of questions')
+    parser.add_argument('--seconds', type=float, default=3,
+                        help='duration of each scenario')
+    parser.add_argument('--scenario', action='append',
+                        help='run only the scenarios with this text in '
+                        'their names (can be given multiple times)')
+    parser.add_argument('--database-url',
+                        help='database to seed and use, instead of SQLite '
+                        'files (all its data is deleted)')
+    parser.add_argument('--data-dir', default=os.path.join(
+        tempfile.gettempdir(), 'api-benchmarks'),
+        help='directory where the seeded SQLite databases are kept')
+    parser.add_argument('--output', help='write the results as JSON to this '
+                        'file')
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for size in [int(size) for size in args.sizes.split(',')]:
+        # seeding and each run use new processes, since the database
+        # engine of a process is created only once
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            url = executor.submit(prepare_database, args, size).result()
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            results += executor.submit(run_size, args, size, url).result()
+
+    report = {
+        'commit': git_commit(),
+        'date': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'database': args.database_url.split(':')[0]
+        if args.database_url else 'sqlite',
+        'seconds': args.seconds,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    print(f'{"size":>8}  {"scenario":<28}{"req/s":>9}{"p50 ms":>9}'
+          f'{"p99 ms":>9}')
+    for result in results:
+        print(f'{result["size"]:>8}  {result["scenario"]:<28}'
+              f'{result["requests_per_second"]:>9}{result["p50_ms"]:>9}'
+              f'{result["p99_ms"]:>9}')
+
+
+if __name__ == '__main__':
+    main()
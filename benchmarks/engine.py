@@ -0,0 +1,116 @@
+"""Concurrent read/write throughput with and without the engine profile.
+
+Each profile runs in a new process, with its own SQLite database, while a
+number of threads read pages of questions and others add new questions.
+
+Usage: python -m benchmarks.engine [--seconds N] [--readers N] [--writers N]
+"""
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import tempfile
+from threading import Thread
+from time import perf_counter
+
+PROFILES = {
+    'default': {'SQLITE_JOURNAL_MODE': '', 'SQLITE_SYNCHRONOUS': '',
+                'SQLITE_BUSY_TIMEOUT': '', 'SQLITE_MMAP_SIZE': '',
+                'SQLITE_CACHE_SIZE': ''},
+    'tuned': {},
+}
+
+
+def run_profile(name, seconds, readers, writers):
+    from sqlalchemy.exc import OperationalError
+    from api.app import create_app, db
+    from api.models import User, Question
+    from config import Config
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.sqlite')
+
+    class BenchmarkConfig(Config):
+        ALCHEMICAL_DATABASE_URL = 'sqlite:///' + path
+        TOKEN_SWEEP_SECONDS = 0
+
+    for key, value in PROFILES[name].items():
+        setattr(BenchmarkConfig, key, value)
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        db.session.add(user)
+        db.session.add_all([Question(body=f'question {i}', author=user)
+                            for i in range(1000)])
+        db.session.commit()
+        user_id = user.id
+
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    deadline = perf_counter() + seconds
+
+    def reader():
+        with app.app_context():
+            while perf_counter() < deadline:
+                try:
+                    db.session.scalars(Question.select().order_by(
+                        Question.timestamp.desc()).limit(25)).all()
+                    db.session.rollback()
+                    counts['reads'] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    counts['errors'] += 1
+
+    def writer():
+        with app.app_context():
+            while perf_counter() < deadline:
+                try:
+                    db.session.add(Question(body='new', user_id=user_id))
+                    db.session.commit()
+                    counts['writes'] += 1
+                except OperationalError:
+                    db.session.rollback()
+                    counts['errors'] += 1
+
+    threads = [Thread(target=reader) for _ in range(readers)] + \
+        [Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {'profile': name,
+            'reads_per_second': round(counts['reads'] / seconds),
+            'writes_per_second': round(counts['writes'] / seconds),
+            'errors': counts['errors']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--json', action='store_true',
+                        help='print the results as JSON')
+    args = parser.parse_args()
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for name in PROFILES:
+        # a new process for each profile, since engines are created only once
+        with ProcessPoolExecutor(1, mp_context=context) as executor:
+            results.append(executor.submit(
+                run_profile, name, args.seconds, args.readers,
+                args.writers).result())
+
+    if args.json:
+        print(json.dumps(results))
+        return
+    print(f'{"profile":<10}{"reads/s":>10}{"writes/s":>10}{"errors":>8}')
+    for result in results:
+        print(f'{result["profile"]:<10}{result["reads_per_second"]:>10}'
+              f'{result["writes_per_second"]:>10}{result["errors"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Startup time and memory of a server process, in each mode.
+
+Each run starts a new Python process, which imports the application, creates
+it and then requests the OpenAPI specification once, as a new gunicorn
+worker would do when the documentation is opened. The median of the runs is
+reported for each mode.
+
+Usage: python -m benchmarks.startup [--runs N] [--output FILE]
+"""
+import argparse
+from datetime import datetime
+import json
+import os
+import platform
+import resource
+from statistics import median
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+MODES = {
+    'default': {},
+    'production': {'PRODUCTION': 'yes'},
+}
+
+
+def child():
+    start = perf_counter()
+    from api import create_app
+    imported = perf_counter()
+    app = create_app()
+    created = perf_counter()
+    response = app.test_client().get('/apispec.json')
+    assert response.status_code == 200
+    done = perf_counter()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'create_app_ms': (created - imported) * 1000,
+        'first_apispec_ms': (done - created) * 1000,
+        'max_rss_mb': resource.getrusage(
+            resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def run(env):
+    start = perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child'], env=env,
+        capture_output=True, text=True, check=True).stdout
+    result = json.loads(output)
+    result['process_ms'] = (perf_counter() - start) * 1000
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='number of processes started for each mode')
+    parser.add_argument('--output', help='write the results as JSON to this '
+                        'file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return child()
+
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ, FLASK_APP='microblog.py', TOKEN_SWEEP_SECONDS='0',
+               DATABASE_URL='sqlite:///' + os.path.join(directory,
+                                                        'db.sqlite'),
+               APISPEC_FILE=os.path.join(directory, 'apispec.json'))
+    subprocess.run([sys.executable, '-m', 'flask', 'apispec', 'build'],
+                   env=env, capture_output=True, check=True)
+
+    results = []
+    for mode, variables in MODES.items():
+        runs = [run(dict(env, **variables)) for _ in range(args.runs)]
+        results.append(dict(mode=mode, **{
+            key: round(median(r[key] for r in runs), 1) for key in runs[0]}))
+
+    report = {
+        'commit': subprocess.run(['git', 'rev-parse', 'HEAD'],
+                                 capture_output=True, text=True).stdout.strip()
+        or None,
+        'date': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'runs': args.runs,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    columns = ['import_ms', 'create_app_ms', 'first_apispec_ms', 'process_ms',
+               'max_rss_mb']
+    print(f'{"mode":<12}' + ''.join(f'{c:>18}' for c in columns))
+    for result in results:
+        print(f'{result["mode"]:<12}' +
+              ''.join(f'{result[c]:>18}' for c in columns))
+
+
+if __name__ == '__main__':
+    main()
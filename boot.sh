@@ -1,3 +1,3 @@
 #!/bin/sh
 flask db upgrade
-exec gunicorn -b :5000 --access-logfile - --error-logfile - microblog:app
+exec gunicorn microblog:app
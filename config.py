@@ -12,19 +12,97 @@ def as_bool(value):
 
 
 class Config:
+    PRODUCTION = as_bool(os.environ.get('PRODUCTION'))
+
     # database options
     ALCHEMICAL_DATABASE_URL = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'db.sqlite')
     ALCHEMICAL_ENGINE_OPTIONS = {'echo': as_bool(os.environ.get('SQL_ECHO'))}
+    DATABASE_POOL_SIZE = int(os.environ.get('DATABASE_POOL_SIZE') or '5')
+    DATABASE_MAX_OVERFLOW = int(os.environ.get('DATABASE_MAX_OVERFLOW') or
+                                '10')
+    DATABASE_POOL_TIMEOUT = int(os.environ.get('DATABASE_POOL_TIMEOUT') or
+                                '30')
+    DATABASE_POOL_RECYCLE = int(os.environ.get('DATABASE_POOL_RECYCLE') or
+                                '1800')
+    DATABASE_POOL_PRE_PING = as_bool(os.environ.get('DATABASE_POOL_PRE_PING')
+                                     or 'yes')
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get(
+        'DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT') or '5000')
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE') or '268435456')
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE') or '-64000')
+
+    LAST_SEEN_WRITE_BEHIND = as_bool(os.environ.get('LAST_SEEN_WRITE_BEHIND'))
+    LAST_SEEN_FLUSH_SECONDS = int(os.environ.get('LAST_SEEN_FLUSH_SECONDS') or
+                                  '60')
+    LAST_SEEN_GRANULARITY_SECONDS = int(os.environ.get(
+        'LAST_SEEN_GRANULARITY_SECONDS') or '60')
+
+    # serialization options
+    FAST_SERIALIZERS = as_bool(os.environ.get('FAST_SERIALIZERS') or 'yes')
+    FAST_JSON = as_bool(os.environ.get('FAST_JSON') or 'yes')
+
+    # pagination options
+    PAGINATION_TOTAL = os.environ.get('PAGINATION_TOTAL', 'exact')
+    PAGINATION_TOTAL_CACHE_SIZE = int(os.environ.get(
+        'PAGINATION_TOTAL_CACHE_SIZE') or '1024')
+    PAGINATION_TOTAL_CACHE_SECONDS = int(os.environ.get(
+        'PAGINATION_TOTAL_CACHE_SECONDS') or '60')
+
+    # response cache options
+    RESPONSE_CACHE = as_bool(os.environ.get('RESPONSE_CACHE'))
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND')
+    RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE') or '1024')
+    RESPONSE_CACHE_SECONDS = int(os.environ.get('RESPONSE_CACHE_SECONDS') or
+                                 '30')
+
+    # compression options
+    COMPRESSION = as_bool(os.environ.get('COMPRESSION') or 'yes')
+    COMPRESSION_ENCODINGS = [name.strip() for name in os.environ.get(
+        'COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',') if name.strip()]
+    COMPRESSION_MIMETYPES = [name.strip() for name in os.environ.get(
+        'COMPRESSION_MIMETYPES', 'application/json,application/x-ndjson,'
+        'text/html,text/plain').split(',') if name.strip()]
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE') or '500')
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL') or
+                                 '6')
+    COMPRESSION_BROTLI_LEVEL = int(os.environ.get('COMPRESSION_BROTLI_LEVEL')
+                                   or '4')
+    COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL') or
+                                 '3')
+
+    # batch options
+    QUESTION_BATCH_MAX = int(os.environ.get('QUESTION_BATCH_MAX') or '1000')
+
+    # export options
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE') or '1000')
 
     # security options
     SECRET_KEY = os.environ.get('SECRET_KEY', 'top-secret!')
     DISABLE_AUTH = as_bool(os.environ.get('DISABLE_AUTH'))
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD',
+                                          'pbkdf2:sha256')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH') or '16')
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or
+                                '0')
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get(
+        'PASSWORD_HASH_MAX_PENDING') or '0')
     ACCESS_TOKEN_MINUTES = int(os.environ.get('ACCESS_TOKEN_MINUTES') or '15')
     REFRESH_TOKEN_DAYS = int(os.environ.get('REFRESH_TOKEN_DAYS') or '7')
     REFRESH_TOKEN_IN_COOKIE = as_bool(os.environ.get(
         'REFRESH_TOKEN_IN_COOKIE') or 'yes')
     REFRESH_TOKEN_IN_BODY = as_bool(os.environ.get('REFRESH_TOKEN_IN_BODY'))
+    ACCESS_TOKEN_SIGNED = as_bool(os.environ.get('ACCESS_TOKEN_SIGNED'))
+    REVOCATION_REFRESH_SECONDS = int(os.environ.get(
+        'REVOCATION_REFRESH_SECONDS') or '10')
+    TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE') or '1024')
+    TOKEN_CACHE_SECONDS = int(os.environ.get('TOKEN_CACHE_SECONDS') or '5')
+    TOKEN_SWEEP_SECONDS = int(os.environ.get('TOKEN_SWEEP_SECONDS') or '3600')
+    TOKEN_SWEEP_BATCH_SIZE = int(os.environ.get('TOKEN_SWEEP_BATCH_SIZE') or
+                                 '1000')
     RESET_TOKEN_MINUTES = int(os.environ.get('RESET_TOKEN_MINUTES') or '15')
     PASSWORD_RESET_URL = os.environ.get('PASSWORD_RESET_URL') or \
         'http://localhost:3000/reset'
@@ -35,6 +113,21 @@ class Config:
     APIFAIRY_TITLE = 'Formaplus API'
     APIFAIRY_VERSION = '1.0'
     APIFAIRY_UI = os.environ.get('DOCS_UI', 'elements')
+    APISPEC_FILE = os.environ.get('APISPEC_FILE') or \
+        os.path.join(basedir, 'apispec.json')
+
+    # metrics options
+    METRICS = as_bool(os.environ.get('METRICS'))
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_WRITE_SECONDS = int(os.environ.get('METRICS_WRITE_SECONDS') or
+                                '5')
+
+    # query budget options
+    QUERY_BUDGET = os.environ.get('QUERY_BUDGET', 'off')
+    QUERY_BUDGET_MAX_QUERIES = int(os.environ.get(
+        'QUERY_BUDGET_MAX_QUERIES') or '10')
+    QUERY_BUDGET_MAX_REPEATS = int(os.environ.get(
+        'QUERY_BUDGET_MAX_REPEATS') or '3')
 
     # email options
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'localhost')
@@ -44,3 +137,10 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER=os.environ.get('MAIL_DEFAULT_SENDER',
                                        'nao-responda@formaplus.com.br')
+    MAIL_QUEUE_SIZE = int(os.environ.get('MAIL_QUEUE_SIZE') or '1000')
+    MAIL_WORKERS = int(os.environ.get('MAIL_WORKERS') or '2')
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE') or '50')
+    MAIL_MAX_RETRIES = int(os.environ.get('MAIL_MAX_RETRIES') or '3')
+    MAIL_RETRY_SECONDS = float(os.environ.get('MAIL_RETRY_SECONDS') or '1')
+    MAIL_SHUTDOWN_SECONDS = int(os.environ.get('MAIL_SHUTDOWN_SECONDS') or
+                                '10')
@@ -0,0 +1,53 @@
+"""Gunicorn settings, loaded automatically from the current directory.
+
+With ``GUNICORN_WORKER_CLASS=gevent`` each worker process serves requests
+in greenlets instead of a single thread, so that a request waiting on the
+database or on the email server does not block the others. Up to
+``GUNICORN_WORKER_CONNECTIONS`` requests are then handled concurrently by
+each worker, sharing its pool of database connections.
+"""
+import glob
+import os
+
+bind = os.environ.get('GUNICORN_BIND') or ':' + os.environ.get('PORT', '5000')
+workers = int(os.environ.get('GUNICORN_WORKERS') or '1')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS') or
+                         '1000')
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # discard the metrics written by the workers of previous runs
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        for path in glob.glob(os.path.join(metrics_dir, '*.json')):
+            os.remove(path)
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+    try:
+        import psycopg2.extensions
+    except ImportError:  # pragma: no cover
+        return
+    # make psycopg2 wait for the database in the gevent loop
+    psycopg2.extensions.set_wait_callback(_gevent_wait_callback)
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    import psycopg2
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == psycopg2.extensions.POLL_OK:
+            break
+        elif state == psycopg2.extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == psycopg2.extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:  # pragma: no cover
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
@@ -0,0 +1,64 @@
+"""question search index
+
+Revision ID: 5f0c3a9d2e71
+Revises: b4e514ee8fdc
+Create Date: 2026-10-18 11:52:40.114372
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0c3a9d2e71'
+down_revision = 'b4e514ee8fdc'
+branch_labels = None
+depends_on = None
+
+# these statements must match the ones in api/search.py
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE questions_fts USING fts5(body, answer, "
+    "content='questions', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER questions_fts_ai AFTER INSERT ON questions BEGIN "
+    "INSERT INTO questions_fts(rowid, body, answer) "
+    "VALUES (new.id, new.body, new.answer); END",
+    "CREATE TRIGGER questions_fts_ad AFTER DELETE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, body, answer) "
+    "VALUES ('delete', old.id, old.body, old.answer); END",
+    "CREATE TRIGGER questions_fts_au AFTER UPDATE ON questions BEGIN "
+    "INSERT INTO questions_fts(questions_fts, rowid, body, answer) "
+    "VALUES ('delete', old.id, old.body, old.answer); "
+    "INSERT INTO questions_fts(rowid, body, answer) "
+    "VALUES (new.id, new.body, new.answer); END",
+    # backfill the index with the existing questions
+    "INSERT INTO questions_fts(questions_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER questions_fts_au",
+    "DROP TRIGGER questions_fts_ad",
+    "DROP TRIGGER questions_fts_ai",
+    "DROP TABLE questions_fts",
+]
+# the index is built from the existing questions when it is created
+POSTGRESQL_UPGRADE = [
+    "CREATE INDEX ix_questions_search ON questions USING GIN "
+    "(to_tsvector('simple', coalesce(body, '') || ' ' || "
+    "coalesce(answer, '')))",
+]
+POSTGRESQL_DOWNGRADE = [
+    "DROP INDEX ix_questions_search",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for statement in {'sqlite': SQLITE_UPGRADE,
+                      'postgresql': POSTGRESQL_UPGRADE}.get(dialect, []):
+        op.execute(statement)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    for statement in {'sqlite': SQLITE_DOWNGRADE,
+                      'postgresql': POSTGRESQL_DOWNGRADE}.get(dialect, []):
+        op.execute(statement)
@@ -0,0 +1,57 @@
+from base64 import b64encode
+import unittest
+
+from api.app import create_app, db
+from api.models import User
+from config import Config
+
+
+class TestConfig(Config):
+    TESTING = True
+    ALCHEMICAL_DATABASE_URL = 'sqlite://'
+    DATABASE_REPLICA_URLS = []
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    PASSWORD_HASH_WORKERS = 0
+    TOKEN_SWEEP_SECONDS = 0
+    LAST_SEEN_WRITE_BEHIND = False
+    # a wide interval, so that last_seen does not change during a test
+    LAST_SEEN_GRANULARITY_SECONDS = 86400
+    RESPONSE_CACHE = False
+    METRICS = False
+    PRODUCTION = False
+    DISABLE_AUTH = False
+    MAIL_SUPPRESS_SEND = True
+    QUERY_BUDGET = 'error'
+
+
+class BaseTestCase(unittest.TestCase):
+    """Base class for the tests, with a user named ``test``.
+
+    No application context is kept pushed during a test, so that each
+    request uses its own database session, as it does in the server.
+    """
+    config = TestConfig
+
+    def setUp(self):
+        self.app = create_app(self.config)
+        with self.app.app_context():
+            db.drop_all()
+            db.create_all()
+            db.session.add(User(username='test', email='test@example.com',
+                                password='foo'))
+            db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def basic_auth_header(self, username='test', password='foo'):
+        credentials = b64encode(f'{username}:{password}'.encode()).decode()
+        return {'Authorization': 'Basic ' + credentials}
+
+    def token_auth_header(self, username='test', password='foo'):
+        rv = self.client.post('/api/tokens', headers=self.basic_auth_header(
+            username, password))
+        assert rv.status_code == 200, rv.get_data(as_text=True)
+        return {'Authorization': 'Bearer ' + rv.json['access_token']}
@@ -0,0 +1,43 @@
+from api.app import db
+from api.models import User, Question
+from tests.base_test_case import BaseTestCase
+
+
+class ETagTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            db.session.add(Question(body='question', answer='answer',
+                                    user_id=1))
+            db.session.commit()
+        self.headers = self.token_auth_header()
+
+    def assert_not_modified(self, url):
+        rv = self.client.get(url, headers=self.headers)
+        assert rv.status_code == 200
+        etag = rv.headers['ETag']
+        rv = self.client.get(url, headers=dict(self.headers,
+                                               **{'If-None-Match': etag}))
+        assert rv.status_code == 304
+        assert rv.headers['ETag'] == etag
+        return etag
+
+    def test_own_resources(self):
+        for url in ['/api/me', '/api/users/1', '/api/users/test',
+                    '/api/questions', '/api/questions/1',
+                    '/api/users/1/questions']:
+            self.assert_not_modified(url)
+
+    def test_changes(self):
+        etag = self.assert_not_modified('/api/questions/1')
+        with self.app.app_context():
+            db.session.get(Question, 1).body = 'changed'
+            db.session.commit()
+        assert self.assert_not_modified('/api/questions/1') != etag
+
+    def test_unrendered_columns(self):
+        etag = self.assert_not_modified('/api/me')
+        with self.app.app_context():
+            db.session.get(User, 1).password = 'bar'
+            db.session.commit()
+        assert self.assert_not_modified('/api/me') == etag
@@ -0,0 +1,34 @@
+from datetime import datetime
+from time import sleep
+import unittest
+
+from flask import Flask
+
+from api.last_seen import LastSeenBuffer
+
+
+class FailingDatabase:
+    def begin(self):
+        raise OSError('database is unavailable')
+
+
+class LastSeenBufferTests(unittest.TestCase):
+    def test_flush_errors_are_logged(self):
+        app = Flask(__name__)
+        app.config.update(LAST_SEEN_WRITE_BEHIND=False,
+                          LAST_SEEN_FLUSH_SECONDS=0.01,
+                          LAST_SEEN_GRANULARITY_SECONDS=0)
+        buffer = LastSeenBuffer()
+        buffer.init_app(app, FailingDatabase())
+        now = datetime.utcnow()
+        try:
+            with self.assertLogs(app.logger, 'ERROR') as logs:
+                buffer.record(1, now)
+                for _ in range(100):
+                    if logs.output:
+                        break
+                    sleep(0.01)
+        finally:
+            buffer._stop.set()
+        assert 'Could not write last_seen timestamps' in logs.output[0]
+        assert buffer.pending == {1: now}
@@ -0,0 +1,96 @@
+from smtplib import SMTPServerDisconnected
+from threading import Event
+from time import sleep
+import unittest
+
+from flask import Flask
+from flask_mail import Message
+
+from api.mail_queue import MailQueue
+
+
+class FakeMail:
+    def __init__(self, delay=0, fail=False, fail_on_close=False):
+        self.delay = delay
+        self.fail = fail
+        self.fail_on_close = fail_on_close
+        self.sent = []
+        self.blocked = Event()
+        self.blocked.set()
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, mail):
+        self.mail = mail
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        if self.mail.fail_on_close:
+            raise SMTPServerDisconnected('Server not connected')
+
+    def send(self, message):
+        self.mail.blocked.wait()
+        sleep(self.mail.delay)
+        if self.mail.fail:
+            raise OSError('connection refused')
+        self.mail.sent.append(message)
+
+
+class MailQueueTests(unittest.TestCase):
+    def create_queue(self, mail, **config):
+        app = Flask(__name__)
+        app.config.update(MAIL_QUEUE_SIZE=100, MAIL_WORKERS=2,
+                          MAIL_BATCH_SIZE=5, MAIL_MAX_RETRIES=3,
+                          MAIL_RETRY_SECONDS=0.5, MAIL_SHUTDOWN_SECONDS=5,
+                          **config)
+        mail_queue = MailQueue()
+        mail_queue.init_app(app, mail)
+        return app, mail_queue
+
+    def message(self, i):
+        return Message(f'subject {i}', recipients=[f'user{i}@example.com'],
+                       sender='sender@example.com')
+
+    def test_stop_sends_queued_messages(self):
+        mail = FakeMail(delay=0.01)
+        mail.blocked.clear()
+        app, mail_queue = self.create_queue(mail)
+        for i in range(20):
+            assert mail_queue.send(self.message(i))
+        mail.blocked.set()
+        assert mail_queue.stop() == 0
+        assert len(mail.sent) == 20
+
+    def test_stop_logs_unsent_messages(self):
+        mail = FakeMail(fail=True)
+        app, mail_queue = self.create_queue(mail)
+        for i in range(10):
+            mail_queue.send(self.message(i))
+        with self.assertLogs(app.logger, 'WARNING') as logs:
+            unsent = mail_queue.stop(timeout=0.2)
+        assert unsent == 10
+        assert 'stopped with 10 unsent messages' in logs.output[-1]
+        assert mail.sent == []
+
+    def test_error_closing_connection(self):
+        mail = FakeMail(fail_on_close=True)
+        app, mail_queue = self.create_queue(mail)
+        with self.assertLogs(app.logger, 'WARNING') as logs:
+            for i in range(3):
+                mail_queue.send(self.message(i))
+            for _ in range(100):
+                if len(mail.sent) == 3:
+                    break
+                sleep(0.01)
+            # the workers are still running
+            mail_queue.send(self.message(3))
+            assert mail_queue.stop(timeout=1) == 0
+        assert len(mail.sent) == 4
+        assert mail_queue.queue.unfinished_tasks == 0
+        assert mail_queue.stats()['retried'] == 0
+        assert 'Error closing the email connection' in logs.output[0]
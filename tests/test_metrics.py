@@ -0,0 +1,30 @@
+import pytest
+import sqlalchemy as sqla
+
+from api.app import db
+from tests.base_test_case import BaseTestCase, TestConfig
+
+
+class MetricsTestConfig(TestConfig):
+    METRICS = True
+    METRICS_DIR = None
+
+
+class MetricsTests(BaseTestCase):
+    config = MetricsTestConfig
+
+    def test_failed_statements_are_not_left_on_connection(self):
+        with self.app.app_context():
+            for _ in range(3):
+                with pytest.raises(sqla.exc.OperationalError):
+                    db.session.execute(sqla.text('SELECT * FROM missing'))
+                db.session.rollback()
+            db.session.execute(sqla.text('SELECT 1'))
+            assert db.session.connection().info['query_start'] == []
+
+    def test_request_metrics(self):
+        headers = self.token_auth_header()
+        assert self.client.get('/api/me', headers=headers).status_code == 200
+        rv = self.client.get('/metrics')
+        assert rv.status_code == 200
+        assert 'sql_statements_total' in rv.get_data(as_text=True)
@@ -0,0 +1,55 @@
+from base64 import urlsafe_b64encode
+from datetime import datetime, timedelta
+import json
+
+from api.app import db
+from api.models import Question
+from tests.base_test_case import BaseTestCase
+
+
+def make_cursor(*data):
+    return urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+class PaginationTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        now = datetime.utcnow()
+        with self.app.app_context():
+            db.session.add_all([
+                Question(body=f'question {i}', answer='answer', user_id=1,
+                         timestamp=now - timedelta(minutes=i))
+                for i in range(30)])
+            db.session.commit()
+        self.headers = self.token_auth_header()
+
+    def test_cursor_pages(self):
+        seen = []
+        rv = self.client.get('/api/questions?cursor=&limit=10',
+                             headers=self.headers)
+        while True:
+            assert rv.status_code == 200
+            seen += [question['id'] for question in rv.json['data']]
+            cursor = rv.json['pagination'].get('next')
+            if not cursor:
+                break
+            rv = self.client.get(f'/api/questions?cursor={cursor}&limit=10',
+                                 headers=self.headers)
+        assert sorted(seen) == list(range(1, 31))
+        assert len(seen) == len(set(seen))
+
+    def test_invalid_cursors(self):
+        now = datetime.utcnow().isoformat()
+        for cursor in ['not-a-cursor',
+                       make_cursor('sideways', now, 1),
+                       make_cursor('next', now),
+                       make_cursor('next', now, 10 ** 30),
+                       make_cursor('next', now, -10 ** 30),
+                       make_cursor('next', now, 1.5),
+                       make_cursor('next', now, True),
+                       make_cursor('next', now, '1'),
+                       make_cursor('next', 12345, 1),
+                       make_cursor('next', 'yesterday', 1)]:
+            rv = self.client.get(f'/api/questions?cursor={cursor}',
+                                 headers=self.headers)
+            assert rv.status_code == 400, cursor
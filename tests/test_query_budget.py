@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sqla
+
+from api.app import db
+from api.models import User, Question
+from api.query_budget import assert_queries
+from tests.base_test_case import BaseTestCase, TestConfig
+
+
+class QueryBudgetTestConfig(TestConfig):
+    # every authenticated request updates last_seen, the most expensive case
+    LAST_SEEN_GRANULARITY_SECONDS = 0
+
+
+class QueryBudgetTests(BaseTestCase):
+    config = QueryBudgetTestConfig
+
+    def setUp(self):
+        super().setUp()
+        self.now = datetime.utcnow()
+        with self.app.app_context():
+            for i in range(40):
+                user = User(username=f'author{i}',
+                            email=f'author{i}@example.com')
+                db.session.add(Question(
+                    body=f'question {i}', answer='answer', author=user,
+                    timestamp=self.now - timedelta(minutes=i)))
+            db.session.commit()
+
+    def budget(self, endpoint):
+        return self.app.view_functions[endpoint].max_queries
+
+    def check_modes(self, endpoint, url, modes):
+        # a new token for each request, so that it is also looked up
+        budget = self.budget(endpoint)
+        counts = []
+        for mode in modes:
+            headers = self.token_auth_header()
+            with assert_queries(budget, max_repeats=3) as recorder:
+                rv = self.client.get(url + mode, headers=headers)
+            assert rv.status_code == 200, (mode, rv.json)
+            assert rv.json['data'], mode
+            counts.append(recorder.count)
+        # the budget is the cost of the most expensive mode
+        assert max(counts) == budget, counts
+
+    def modes(self, url):
+        after = (self.now - timedelta(minutes=5)).isoformat()
+        headers = self.token_auth_header()
+        cursor = self.client.get(url + '?cursor=&limit=5',
+                                 headers=headers).json['pagination']['next']
+        return ['', '?offset=10', '?total=false', '?offset=10&total=false',
+                '?after=' + after, '?after=' + after + '&total=false',
+                '?cursor=', '?cursor=' + cursor]
+
+    def test_questions(self):
+        self.check_modes('questions.all', '/api/questions',
+                         self.modes('/api/questions'))
+
+    def test_user_questions(self):
+        url = '/api/users/2/questions'
+        with self.app.app_context():
+            db.session.execute(sqla.update(Question).values(user_id=2))
+            db.session.commit()
+        self.check_modes('questions.user_all', url, self.modes(url))
+
+    def test_users(self):
+        headers = self.token_auth_header()
+        cursor = self.client.get('/api/users?cursor=&limit=5',
+                                 headers=headers).json['pagination']['next']
+        self.check_modes('users.all', '/api/users', [
+            '', '?offset=10', '?total=false', '?offset=10&total=false',
+            '?cursor=', '?cursor=' + cursor])
+
+    def test_search(self):
+        self.check_modes('questions.search',
+                         '/api/questions/search?q=question', [
+                             '', '&offset=10', '&total=false',
+                             '&offset=10&total=false'])
+
+    def test_batch(self):
+        budget = self.budget('questions.batch')
+        counts = set()
+        for size in [1, 10, 50]:
+            headers = self.token_auth_header()
+            batch = [{'body': f'question {i}', 'answer': 'answer'}
+                     for i in range(size)]
+            with assert_queries(budget, max_repeats=3) as recorder:
+                rv = self.client.post('/api/questions/batch', json=batch,
+                                      headers=headers)
+            assert rv.status_code == 201
+            assert len(rv.json) == size
+            counts.add(recorder.count)
+        assert counts == {budget}
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from api.app import db
+from api.models import User, Question
+from api.query_budget import QueryRecorder
+from tests.base_test_case import BaseTestCase
+
+
+class QuestionTests(BaseTestCase):
+    def add_questions(self, count):
+        # each question has its own author, so that loading the authors
+        # separately would show up as a growing number of queries
+        now = datetime.utcnow()
+        with self.app.app_context():
+            for i in range(count):
+                user = User(username=f'author{i}',
+                            email=f'author{i}@example.com')
+                db.session.add(Question(
+                    body=f'question {i}', answer='answer', author=user,
+                    timestamp=now - timedelta(minutes=i)))
+            db.session.commit()
+
+    def count_queries(self, url, headers):
+        # the first request caches the access token
+        self.client.get(url, headers=headers)
+        with QueryRecorder() as recorder:
+            rv = self.client.get(url, headers=headers)
+        assert rv.status_code == 200
+        return recorder.count, len(rv.json['data'])
+
+    def test_page_queries_are_constant(self):
+        headers = self.token_auth_header()
+        counts = set()
+        for total in [10, 100]:
+            self.add_questions(total)
+            for limit in [1, 10, 25]:
+                count, items = self.count_queries(
+                    f'/api/questions?limit={limit}', headers)
+                assert items == min(limit, total)
+                counts.add(count)
+            with self.app.app_context():
+                db.session.execute(Question.delete())
+                db.session.execute(User.delete().where(User.id != 1))
+                db.session.commit()
+        assert len(counts) == 1, counts
+
+    def test_user_page_queries_are_constant(self):
+        headers = self.token_auth_header()
+        counts = set()
+        for total in [10, 100]:
+            with self.app.app_context():
+                db.session.add_all([
+                    Question(body=f'question {i}', answer='answer', user_id=1)
+                    for i in range(total)])
+                db.session.commit()
+            count, items = self.count_queries('/api/users/1/questions',
+                                              headers)
+            assert items == min(total, 25)
+            counts.add(count)
+        assert len(counts) == 1, counts
+
+    def test_batch(self):
+        headers = self.token_auth_header()
+        self.client.get('/api/me', headers=headers)  # cache the token
+        counts = set()
+        for size in [1, 10, 30]:
+            batch = [{'body': f'question {i}', 'answer': f'answer {i}'}
+                     for i in range(size)]
+            with QueryRecorder() as recorder:
+                rv = self.client.post('/api/questions/batch', json=batch,
+                                      headers=headers)
+            assert rv.status_code == 201
+            assert [(q['body'], q['answer']) for q in rv.json] == [
+                (q['body'], q['answer']) for q in batch]
+            assert all(q['author']['id'] == 1 for q in rv.json)
+            counts.add(recorder.count)
+        assert len(counts) == 1, counts
+        with self.app.app_context():
+            assert db.session.scalar(Question.select().filter_by(
+                body='question 29')) is not None
+
+    def test_batch_invalid(self):
+        headers = self.token_auth_header()
+        rv = self.client.post('/api/questions/batch', json=[],
+                              headers=headers)
+        assert rv.status_code == 400
+        rv = self.client.post('/api/questions/batch', json=[
+            {'body': 'question', 'answer': 'answer'}, {'body': ''}],
+            headers=headers)
+        assert rv.status_code == 400
+        assert list(rv.json['errors']['json']) == ['1']
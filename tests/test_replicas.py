@@ -0,0 +1,91 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from flask import g
+
+from api.app import db
+from api.models import Question, User
+from tests.base_test_case import BaseTestCase, TestConfig
+
+directory = tempfile.mkdtemp()
+primary = os.path.join(directory, 'primary.sqlite')
+replica = os.path.join(directory, 'replica.sqlite')
+
+
+class ReplicaTestConfig(TestConfig):
+    ALCHEMICAL_DATABASE_URL = 'sqlite:///' + primary
+    DATABASE_REPLICA_URLS = ['sqlite:///' + replica]
+    # without a write-ahead log the database is a single file to copy
+    SQLITE_JOURNAL_MODE = 'delete'
+
+
+class ReplicaTests(BaseTestCase):
+    config = ReplicaTestConfig
+
+    def setUp(self):
+        # the engines are created once, so those of other tests are reset
+        self.reset_engines()
+        super().setUp()
+        with self.app.app_context():
+            db.session.add(User(username='other', email='o@example.com'))
+            db.session.add(Question(body='question', answer='answer',
+                                    user_id=1))
+            db.session.commit()
+        self.headers = self.token_auth_header()
+
+        # the replica starts as a copy of the primary database, with
+        # different contents, to know where each query is sent
+        shutil.copy(primary, replica)
+        with sqlite3.connect(replica) as conn:
+            conn.execute("UPDATE questions SET body = 'replica question'")
+            conn.execute("UPDATE users SET about_me = 'replica user'")
+
+    def tearDown(self):
+        super().tearDown()
+        self.reset_engines()
+
+    def reset_engines(self):
+        for engine in (db.engines or {}).values():
+            engine.dispose()
+        db.engines = None
+
+    def read_replica(self, sql):
+        with sqlite3.connect(replica) as conn:
+            return conn.execute(sql).fetchall()
+
+    def test_reads_go_to_replica(self):
+        rv = self.client.get('/api/questions', headers=self.headers)
+        assert [q['body'] for q in rv.json['data']] == ['replica question']
+        rv = self.client.get('/api/questions/1', headers=self.headers)
+        assert rv.json['body'] == 'replica question'
+        rv = self.client.get('/api/users/2', headers=self.headers)
+        assert rv.json['about_me'] == 'replica user'
+
+    def test_other_requests_go_to_primary(self):
+        rv = self.client.get('/api/me', headers=self.headers)
+        assert rv.json.get('about_me') is None
+
+    def test_writes_go_to_primary(self):
+        rv = self.client.put('/api/questions/1', json={'body': 'edited'},
+                             headers=self.headers)
+        assert rv.status_code == 200
+        assert rv.json['body'] == 'edited'
+        with sqlite3.connect(primary) as conn:
+            assert conn.execute('SELECT body FROM questions').fetchall() == [
+                ('edited',)]
+        assert self.read_replica('SELECT body FROM questions') == [
+            ('replica question',)]
+
+    def test_reads_after_writes_go_to_primary(self):
+        with self.app.test_request_context():
+            g.read_only = True
+            assert db.session.get(Question, 1).body == 'replica question'
+            db.session.expunge_all()
+            db.session.add(Question(body='new', answer='answer', user_id=1))
+            db.session.flush()
+            bodies = db.session.scalars(Question.select().with_only_columns(
+                Question.body).order_by(Question.id)).all()
+            assert bodies == ['question', 'new']
+            db.session.rollback()
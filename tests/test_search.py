@@ -0,0 +1,51 @@
+from api.app import db
+from api.models import Question
+from api.search import search_questions
+from tests.base_test_case import BaseTestCase
+
+
+class SearchTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            db.session.add_all([
+                Question(body='What is 100% of ten?', answer='ten',
+                         user_id=1),
+                Question(body='What is a snake_case name?', answer='a name',
+                         user_id=1),
+                Question(body='What is 100 of ten?', answer='a thousand',
+                         user_id=1),
+            ])
+            db.session.commit()
+        self.headers = self.token_auth_header()
+
+    def search(self, q):
+        return self.client.get('/api/questions/search', query_string={'q': q},
+                               headers=self.headers)
+
+    def test_search(self):
+        rv = self.search('snake_case')
+        assert rv.status_code == 200
+        assert [q['id'] for q in rv.json['data']] == [2]
+        rv = self.search('ten what')
+        assert {q['id'] for q in rv.json['data']} == {1, 3}
+
+    def test_blank_query(self):
+        for q in ['', ' ', '   ', '\t\n']:
+            rv = self.search(q)
+            assert rv.status_code == 400, q
+            assert 'q' in rv.json['errors']['query']
+
+    def test_query_syntax_is_literal(self):
+        for q in ['"', '-', '*', 'AND', 'NEAR(', '100%', ':', '^ten']:
+            assert self.search(q).status_code == 200, q
+
+    def test_fallback_escapes_wildcards(self):
+        with self.app.app_context():
+            def ids(text):
+                return [q.id for q in db.session.scalars(
+                    search_questions(text, 'other'))]
+
+            assert ids('100%') == [1]
+            assert ids('e_c') == [2]
+            assert set(ids('is')) == {1, 2, 3}
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from api.app import db
+from api.models import User, Question
+from api.schemas import UserSchema, QuestionSchema
+from tests.base_test_case import BaseTestCase
+
+
+class SerializerTests(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.app.app_context():
+            user = User(username='susan', email='susan@example.com',
+                        about_me='Olá, mundo!', last_seen=datetime.utcnow())
+            db.session.add_all([
+                user,
+                Question(body='question', answer='answer', author=user),
+                Question(body='questão', answer='resposta', user_id=1,
+                         timestamp=datetime(2022, 1, 1, 12, 30)),
+            ])
+            db.session.commit()
+
+    def dump_both(self, schema, obj, many=None):
+        self.app.config['FAST_SERIALIZERS'] = True
+        fast = schema.dump(obj, many=many)
+        self.app.config['FAST_SERIALIZERS'] = False
+        slow = schema.dump(obj, many=many)
+        return fast, slow
+
+    def test_user_schema(self):
+        with self.app.test_request_context():
+            users = db.session.scalars(User.select()).all()
+            for user in users:
+                fast, slow = self.dump_both(UserSchema(), user)
+                assert fast == slow
+                assert list(fast) == list(slow)
+            fast, slow = self.dump_both(UserSchema(many=True), users)
+            assert fast == slow
+
+    def test_question_schema(self):
+        with self.app.test_request_context():
+            questions = db.session.scalars(Question.select()).all()
+            for question in questions:
+                fast, slow = self.dump_both(QuestionSchema(), question)
+                assert fast == slow
+                assert list(fast) == list(slow)
+                assert fast['timestamp'].endswith('Z')
+            fast, slow = self.dump_both(QuestionSchema(), questions,
+                                        many=True)
+            assert fast == slow
+
+    def test_responses(self):
+        headers = self.token_auth_header()
+        responses = []
+        for fast in [True, False]:
+            self.app.config['FAST_SERIALIZERS'] = fast
+            responses.append([self.client.get(url, headers=headers).json
+                              for url in ['/api/questions', '/api/users',
+                                          '/api/questions/1']])
+        assert responses[0] == responses[1]
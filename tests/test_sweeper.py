@@ -0,0 +1,30 @@
+from time import sleep
+import unittest
+from unittest import mock
+
+from flask import Flask
+
+from api.sweeper import TokenSweeper
+
+
+class TokenSweeperTests(unittest.TestCase):
+    def test_sweep_errors_are_logged(self):
+        app = Flask(__name__)
+        app.config.update(TOKEN_SWEEP_SECONDS=0.01,
+                          TOKEN_SWEEP_BATCH_SIZE=100)
+        sweeper = TokenSweeper()
+        sweeper.init_app(app)
+        try:
+            with mock.patch.object(sweeper, 'sweep',
+                                   side_effect=OSError('database error')), \
+                    self.assertLogs(app.logger, 'ERROR') as logs:
+                sweeper.start()
+                for _ in range(100):
+                    if len(logs.output) >= 2:
+                        break
+                    sleep(0.01)
+        finally:
+            sweeper.stop()
+        # the thread keeps running after an error
+        assert len(logs.output) >= 2
+        assert 'Could not remove expired tokens' in logs.output[0]
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta
+from time import monotonic
+from unittest import mock
+
+import jwt
+import sqlalchemy as sqla
+
+from api.app import db, token_cache, revoked_tokens
+from api.models import User, Token
+from api.query_budget import QueryRecorder
+from tests.base_test_case import BaseTestCase, TestConfig
+
+
+class TokenCacheTestConfig(TestConfig):
+    # longer than the access token lifetime, which then bounds the entries
+    TOKEN_CACHE_SECONDS = 3600
+
+
+class NoTokenCacheTestConfig(TestConfig):
+    TOKEN_CACHE_SIZE = 0
+
+
+class SignedTokenTestConfig(TestConfig):
+    ACCESS_TOKEN_SIGNED = True
+    REFRESH_TOKEN_IN_BODY = True
+    # revocations by other processes are only seen after invalidate()
+    REVOCATION_REFRESH_SECONDS = 3600
+
+
+def token_queries(recorder):
+    return [statement for statement, _ in recorder.statements
+            if 'FROM tokens' in statement]
+
+
+class TokenCacheTests(BaseTestCase):
+    config = TokenCacheTestConfig
+
+    def test_cached_token(self):
+        headers = self.token_auth_header()
+        assert self.client.get('/api/me', headers=headers).status_code == 200
+        with QueryRecorder() as recorder:
+            rv = self.client.get('/api/me', headers=headers)
+        assert rv.status_code == 200
+        assert token_queries(recorder) == []
+
+    def test_revoked_token_is_evicted(self):
+        headers = self.token_auth_header()
+        assert self.client.get('/api/me', headers=headers).status_code == 200
+        rv = self.client.delete('/api/tokens', headers=headers)
+        assert rv.status_code == 204
+        assert self.client.get('/api/me', headers=headers).status_code == 401
+
+    def test_revoke_all_evicts_tokens(self):
+        headers = [self.token_auth_header() for _ in range(2)]
+        for h in headers:
+            assert self.client.get('/api/me', headers=h).status_code == 200
+        with self.app.app_context():
+            db.session.get(User, 1).revoke_all()
+            db.session.commit()
+        for h in headers:
+            assert self.client.get('/api/me', headers=h).status_code == 401
+
+    def test_entry_does_not_outlive_token(self):
+        headers = self.token_auth_header()
+        assert self.client.get('/api/me', headers=headers).status_code == 200
+        access_token = headers['Authorization'].split()[1]
+        lifetime = self.app.config['ACCESS_TOKEN_MINUTES'] * 60
+        _, expiration = token_cache._data[access_token]
+        assert expiration <= monotonic() + lifetime
+
+        # a cached token is rejected once its access expiration passes
+        class Later(datetime):
+            @classmethod
+            def utcnow(cls):
+                return datetime.utcnow() + timedelta(seconds=lifetime + 1)
+
+        with mock.patch('api.models.datetime', Later):
+            rv = self.client.get('/api/me', headers=headers)
+        assert rv.status_code == 401
+        assert access_token in token_cache._data
+
+
+class NoTokenCacheTests(BaseTestCase):
+    config = NoTokenCacheTestConfig
+
+    def test_cache_disabled(self):
+        headers = self.token_auth_header()
+        for _ in range(2):
+            with QueryRecorder() as recorder:
+                rv = self.client.get('/api/me', headers=headers)
+            assert rv.status_code == 200
+            assert len(token_queries(recorder)) == 1
+        assert token_cache.stats()['size'] == 0
+
+        # a token removed from the database is rejected right away
+        with self.app.app_context():
+            db.session.execute(Token.delete())
+            db.session.commit()
+        assert self.client.get('/api/me', headers=headers).status_code == 401
+
+
+class SignedTokenTests(BaseTestCase):
+    config = SignedTokenTestConfig
+
+    def login(self):
+        rv = self.client.post('/api/tokens', headers=self.basic_auth_header())
+        assert rv.status_code == 200
+        return rv.json
+
+    def me(self, access_token):
+        return self.client.get('/api/me', headers={
+            'Authorization': 'Bearer ' + access_token}).status_code
+
+    def refresh(self, tokens):
+        return self.client.put('/api/tokens', json={
+            'access_token': tokens['access_token'],
+            'refresh_token': tokens['refresh_token']})
+
+    def sign(self, key=None, **claims):
+        with self.app.app_context():
+            token = db.session.scalar(Token.select())
+        claims = dict({'exp': token.access_expiration,
+                       'jti': token.access_token, 'sub': '1'}, **claims)
+        return jwt.encode(claims, key or self.app.config['SECRET_KEY'],
+                          algorithm='HS256')
+
+    def test_login(self):
+        tokens = self.login()
+        claims = jwt.decode(tokens['access_token'],
+                            self.app.config['SECRET_KEY'],
+                            algorithms=['HS256'])
+        assert claims['sub'] == '1'
+        assert self.me(tokens['access_token']) == 200
+
+    def test_refresh(self):
+        tokens = self.login()
+        assert self.me(tokens['access_token']) == 200
+        rv = self.refresh(tokens)
+        assert rv.status_code == 200
+        assert self.me(rv.json['access_token']) == 200
+        # the refreshed access token is revoked before it expires
+        assert self.me(tokens['access_token']) == 401
+
+    def test_refresh_token_reuse_revokes_all_tokens(self):
+        tokens = self.login()
+        other = self.login()
+        new_tokens = self.refresh(tokens).json
+        assert self.me(new_tokens['access_token']) == 200
+        assert self.me(other['access_token']) == 200
+        assert self.refresh(tokens).status_code == 401
+        assert self.me(new_tokens['access_token']) == 401
+        assert self.me(other['access_token']) == 401
+        assert self.refresh(other).status_code == 401
+
+    def test_invalid_signature(self):
+        self.login()
+        assert self.me(self.sign()) == 200
+        assert self.me(self.sign(key='forged')) == 401
+        header, payload, signature = self.sign().split('.')
+        assert self.me(f'{header}.{payload}.{signature[::-1]}') == 401
+        assert self.me(self.sign(sub='2', key='forged')) == 401
+
+    def test_expired_token(self):
+        self.login()
+        expired = self.sign(exp=datetime.utcnow() - timedelta(seconds=1))
+        assert self.me(expired) == 401
+
+    def test_revoke(self):
+        access_token = self.login()['access_token']
+        assert self.me(access_token) == 200
+        rv = self.client.delete('/api/tokens', headers={
+            'Authorization': 'Bearer ' + access_token})
+        assert rv.status_code == 204
+        assert self.me(access_token) == 401
+
+    def test_revocation_by_other_process(self):
+        access_token = self.login()['access_token']
+        assert self.me(access_token) == 200
+
+        # another process revokes the token in the database only
+        now = datetime.utcnow()
+        with self.app.app_context():
+            db.session.execute(sqla.update(Token).values(
+                access_expiration=now, refresh_expiration=now))
+            db.session.commit()
+        assert self.me(access_token) == 200
+        revoked_tokens.invalidate()
+        assert self.me(access_token) == 401